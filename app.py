@@ -1,14 +1,29 @@
-from fastapi import FastAPI, Request, Body, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, Body, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from kiwisolver import strength
 from pydantic import BaseModel
-from spellchecker import SpellChecker
 import uvicorn
+import asyncio
 import os
-from utils import detect_and_process_id_card, read_factory_number
-from JwtKey import generate_jwt_secret
+from utils import (
+    detect_and_process_id_card, detect_and_process_id_cards_batch, read_factory_number, warmup_tesseract,
+    factory_engine, build_id_response
+)
+from model_registry import init_models, is_warmed_up, loaded_models
+from worker_pool import WorkerPool, QueueFullError
+from image_io import read_body_limited, check_image_header, UploadTooLargeError, InvalidImageError
+from starlette.formparsers import MultiPartParser
+from result_cache import get_cache
+from jobs import JobQueue, JobRunner, public_view
+from national_id import decode_national_ids, records, InvalidNationalIdError
+from spell_index import get_index
+from typing import List, Optional
+import time
+import json
+import metrics
+import events
+import config
 # from utils2 import read_factory_number
 # from transformers import AutoTokenizer, AutoModelForMaskedLM
 # import torch
@@ -23,6 +38,76 @@ app = FastAPI(title="Arabic Spell Checker", version="1.1")
 # ---------------------------------------------------
 templates = Jinja2Templates(directory="templates")
 
+# ---------------------------------------------------
+# OCR worker pool (keeps the CPU-bound pipeline off the event loop)
+# ---------------------------------------------------
+ocr_pool = WorkerPool()
+
+
+def queue_full_response(e: QueueFullError):
+    return HTTPException(
+        status_code=config.POOL_REJECT_STATUS,
+        detail="OCR service is busy, please retry later",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+# ---------------------------------------------------
+# Keep multipart uploads in memory (Starlette spools parts > 1 MB to disk)
+# ---------------------------------------------------
+MultiPartParser.spool_max_size = config.UPLOAD_MAX_BYTES + 1
+MULTIPART_OVERHEAD = 64 * 1024
+
+# ---------------------------------------------------
+# Request metrics (latency / status per route)
+# ---------------------------------------------------
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.REQUEST_SECONDS.labels(path).observe(time.perf_counter() - start)
+        metrics.REQUESTS.labels(path, str(status)).inc()
+
+# ---------------------------------------------------
+# Load + warm up YOLO / EasyOCR models once per worker
+# (in the background: /healthz answers at once, /readyz once warm)
+# ---------------------------------------------------
+readiness = {"ready": False, "error": None}
+
+
+def warm_up():
+    try:
+        if ocr_pool.kind == "thread":
+            init_models()
+            if config.PRELOAD_MODELS:
+                warmup_tesseract()
+        else:
+            # Process pools load the models inside each child instead
+            ocr_pool.prime()
+        readiness["ready"] = True
+        print("[INFO] OCR models ready")
+    except Exception as e:
+        readiness["error"] = str(e)
+        print(f"⚠️ Model warm-up failed: {e}")
+
+
+@app.on_event("startup")
+async def load_models():
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+
+@app.on_event("shutdown")
+async def stop_pool():
+    if job_runner is not None:
+        await job_runner.stop()
+    ocr_pool.shutdown()
+
 # ---------------------------------------------------
 # Load AraBERT Model & Tokenizer
 # ---------------------------------------------------
@@ -36,6 +121,25 @@ templates = Jinja2Templates(directory="templates")
 class SpellRequest(BaseModel):
     text: str
 
+
+class BatchItem(BaseModel):
+    image_path: str
+    application_number: str
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+
+class JobRequest(BaseModel):
+    image_path: str
+    application_number: str
+    callback_url: Optional[str] = None
+
+
+class NidBatchRequest(BaseModel):
+    national_ids: List[str]
+
 # ---------------------------------------------------
 # Home Route
 # ---------------------------------------------------
@@ -49,40 +153,134 @@ def home():
 @app.post("/process-id-path/")
 async def process_id_card_path(
     image_path: str = Body(..., embed=True),
-    application_number: str = Body(..., embed=True)
+    application_number: str = Body(..., embed=True),
+    debug_trace: bool = Body(False, embed=True)
 ):
     if not os.path.exists(image_path):
         raise HTTPException(status_code=400, detail="File path does not exist")
 
     try:
-        firstName, secName, fullName, nationalId, address, serial, birth, city, gender = detect_and_process_id_card(
-            image_path, application_number
-        )
+        if debug_trace and config.TRACE_ENABLED:
+            # Per-stage timings for this request, returned under "Trace"
+            result, trace = await ocr_pool.run(
+                metrics.traced, detect_and_process_id_card, image_path, application_number
+            )
+            response = build_id_response(*result)
+            response["Trace"] = trace
+            return response
 
-        # --- Process Second Name (max 4 parts) ---
-        secName_parts = secName.split()
-        if len(secName_parts) > 4:
-            secName = " ".join(secName_parts[:4])
+        result = await ocr_pool.run(detect_and_process_id_card, image_path, application_number)
+        return build_id_response(*result)
 
-        # --- Process Full Name (exactly 5 parts if possible) ---
-        fullName_parts = fullName.split()
-        if len(fullName_parts) > 5:
-            fullName = " ".join(fullName_parts[:5])
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    except InvalidNationalIdError as e:
+        raise HTTPException(status_code=422, detail=f"Error processing ID card: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing ID card: {str(e)}")
 
-        return {
-            "First Name": firstName,
-            "Second Name": secName,
-            "Full Name": fullName,
-            "National Id": nationalId,
-            "Address": address,
-            "Factory Number": serial,
-            "Birth Date": birth,
-            "City": city,
-            "Gender": gender
-        }
 
+def format_event(event, data, fmt):
+    payload = json.dumps(data, ensure_ascii=False)
+    if fmt == "ndjson":
+        return f'{{"event": "{event}", "data": {payload}}}\n'
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@app.post("/process-id-stream/")
+async def process_id_card_stream(
+    image_path: str = Body(..., embed=True),
+    application_number: str = Body(..., embed=True),
+    format: str = Query("sse", pattern="^(sse|ndjson)$")
+):
+    """
+    Same pipeline as /process-id-path/, streamed as SSE (default) or NDJSON:
+    `card`, `national_id`, `first_name`, `second_name`, `address` and
+    `factory_number` in the order they finish, then `result` (the full
+    response) or `error`. Disconnecting stops the pipeline at its next event.
+    """
+    if not os.path.exists(image_path):
+        raise HTTPException(status_code=400, detail="File path does not exist")
+
+    stream = events.EventStream(asyncio.get_running_loop())
+    try:
+        if ocr_pool.kind == "thread":
+            task = ocr_pool.start(events.streamed, stream, detect_and_process_id_card,
+                                  image_path, application_number)
+        else:
+            # The listener cannot cross into a worker process: only `result` is sent
+            task = ocr_pool.start(detect_and_process_id_card, image_path, application_number)
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())  # retrieved below or dropped
+
+    async def event_source():
+        try:
+            while True:
+                next_event = asyncio.ensure_future(stream.queue.get())
+                await asyncio.wait({next_event, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_event.done():
+                    next_event.cancel()
+                    break
+                yield format_event(*next_event.result(), format)
+
+            while not stream.queue.empty():
+                yield format_event(*stream.queue.get_nowait(), format)
+
+            try:
+                result = task.result()
+            except InvalidNationalIdError as e:
+                yield format_event("error", {"status": 422, "detail": f"Error processing ID card: {e}"}, format)
+            except Exception as e:
+                yield format_event("error", {"status": 500, "detail": f"Error processing ID card: {e}"}, format)
+            else:
+                yield format_event("result", build_id_response(*result), format)
+        finally:
+            stream.cancel()  # client gone (or done): free the worker at its next event
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(event_source(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/process-id-batch/")
+async def process_id_batch(request: BatchRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items supplied")
+    if len(request.items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many items: {len(request.items)} > {config.BATCH_MAX_ITEMS}"
+        )
+
+    items = [(item.image_path, item.application_number) for item in request.items]
+    try:
+        outcomes = await ocr_pool.run(detect_and_process_id_cards_batch, items)
+    except QueueFullError as e:
+        raise queue_full_response(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing ID card: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+    responses = []
+    for item, (result, error) in zip(request.items, outcomes):
+        if error is None:
+            responses.append({
+                "application_number": item.application_number,
+                "status": "success",
+                "data": build_id_response(*result)
+            })
+        else:
+            responses.append({
+                "application_number": item.application_number,
+                "status": "error",
+                "message": error
+            })
+
+    return {
+        "total": len(responses),
+        "succeeded": sum(1 for r in responses if r["status"] == "success"),
+        "results": responses
+    }
 
 
 @app.post("/read-factory/")
@@ -91,13 +289,15 @@ async def process_id_card_path(
     application_number: str = Body(..., embed=True)
 ):
     try:
-        serial_number = read_factory_number(image_path)
+        serial_number = await ocr_pool.run(read_factory_number, image_path)
 
         return {
             "application_number": application_number,
             "factory_number": serial_number,
             "status": "success"
         }
+    except QueueFullError as e:
+        raise queue_full_response(e)
     except Exception as e:
         return {
             "application_number": application_number,
@@ -106,8 +306,221 @@ async def process_id_card_path(
             "message": str(e)
         }
 
+# ---------------------------------------------------
+# Upload Endpoints (multipart or raw image body, decoded in memory)
+# ---------------------------------------------------
+async def read_upload(request: Request, application_number):
+    content_type = request.headers.get("content-type", "")
+
+    try:
+        if content_type.startswith("multipart/form-data"):
+            declared = request.headers.get("content-length")
+            if not declared or not declared.isdigit():
+                raise HTTPException(status_code=411, detail="Content-Length required for multipart uploads")
+            if int(declared) > config.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD:
+                raise UploadTooLargeError(f"Upload exceeds {config.UPLOAD_MAX_BYTES} bytes")
+
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart field 'file' is required")
+            data = await upload.read()
+            if len(data) > config.UPLOAD_MAX_BYTES:
+                raise UploadTooLargeError(f"Upload exceeds {config.UPLOAD_MAX_BYTES} bytes")
+            application_number = form.get("application_number") or application_number
+        else:
+            data = await read_body_limited(request)
+            application_number = application_number or request.headers.get("x-application-number")
+
+        # Header-only check: size / pixel limits before the full decode
+        check_image_header(data)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    if not application_number:
+        raise HTTPException(status_code=400, detail="application_number is required")
+    return data, application_number
+
+
+@app.post("/process-id-upload/")
+async def process_id_card_upload(request: Request, application_number: str = Query(None)):
+    data, application_number = await read_upload(request, application_number)
+
+    try:
+        result = await ocr_pool.run(detect_and_process_id_card, data, application_number)
+        return build_id_response(*result)
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    except InvalidNationalIdError as e:
+        raise HTTPException(status_code=422, detail=f"Error processing ID card: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing ID card: {str(e)}")
+
+
+@app.post("/read-factory-upload/")
+async def read_factory_upload(request: Request, application_number: str = Query(None)):
+    data, application_number = await read_upload(request, application_number)
+
+    try:
+        serial_number = await ocr_pool.run(read_factory_number, data)
+
+        return {
+            "application_number": application_number,
+            "factory_number": serial_number,
+            "status": "success"
+        }
+    except QueueFullError as e:
+        raise queue_full_response(e)
+    except Exception as e:
+        return {
+            "application_number": application_number,
+            "factory_number": None,
+            "status": "error",
+            "message": str(e)
+        }
+
+
+# ---------------------------------------------------
+# Asynchronous Jobs (submit now, poll / callback later)
+# ---------------------------------------------------
+job_queue = None
+job_runner = None
+
+
+async def process_job(job):
+    result = await ocr_pool.run(detect_and_process_id_card, job["image_path"], job["application_number"])
+    return build_id_response(*result)
+
+
+@app.on_event("startup")
+async def start_jobs():
+    global job_queue, job_runner
+    if not config.JOBS_ENABLED:
+        return
+    job_queue = JobQueue()
+    job_runner = JobRunner(job_queue, process_job, busy_errors=(QueueFullError,))
+    job_runner.start()
+
+
+def require_jobs():
+    if job_queue is None:
+        raise HTTPException(status_code=404, detail="Job API is disabled")
+    return job_queue
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    queue = require_jobs()
+    if not os.path.exists(request.image_path):
+        raise HTTPException(status_code=400, detail="File path does not exist")
+
+    try:
+        job_id = queue.submit(request.image_path, request.application_number, request.callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job_runner.notify()
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = require_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_view(job)
+
+
+@app.post("/decode-nid-batch/")
+def decode_nid_batch(request: NidBatchRequest):
+    if len(request.national_ids) > config.NID_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many IDs: {len(request.national_ids)} > {config.NID_BATCH_MAX_ITEMS}"
+        )
+
+    decoded = decode_national_ids(request.national_ids)
+    return {
+        "count": len(request.national_ids),
+        "valid": int(decoded["valid"].sum()),
+        "results": records(decoded)
+    }
+
+
+@app.post("/spell-check/")
+def spell_check(request: SpellRequest):
+    index = get_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Spell index is not available (see OCR_SPELL_LEXICON)")
+
+    corrected, tokens = index.correct(request.text)
+    return {
+        "text": request.text,
+        "corrected": corrected,
+        "tokens": tokens
+    }
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    metrics.set_gauges(metrics.POOL_GAUGE, ocr_pool.stats())
+    cache = get_cache()
+    if cache is not None:
+        metrics.set_gauges(metrics.CACHE_GAUGE, cache.stats())
+    if job_queue is not None:
+        for status, count in job_queue.counts().items():
+            metrics.JOBS_GAUGE.labels(status).set(count)
+
+    status = 200 if metrics.available() else 501
+    return Response(metrics.render(), status_code=status, media_type=metrics.CONTENT_TYPE_LATEST)
+
+
+@app.get("/pool-stats/")
+def pool_stats():
+    stats = ocr_pool.stats()
+    if job_queue is not None:
+        stats["jobs"] = job_queue.counts()
+    return stats
+
+@app.get("/cache-stats/")
+def cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+@app.get("/factory-variant-stats/")
+def factory_variant_stats():
+    return {
+        "order": [factory_engine.stats.names[i] for i in factory_engine.stats.order()],
+        "variants": factory_engine.stats.snapshot()
+    }
+
+@app.get("/healthz")
+def healthz():
+    # Process is up and serving; says nothing about the models
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    body = {
+        "ready": readiness["ready"],
+        "warmed_up": is_warmed_up(),
+        "models": loaded_models(),
+        "pool": ocr_pool.kind,
+    }
+    if readiness["error"]:
+        body["error"] = readiness["error"]
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=body)
+
+
 @app.get("/generate-jwt/")
 async def generate_jwt_endpoint():
+    try:
+        from JwtKey import generate_jwt_secret
+    except ImportError:
+        raise HTTPException(status_code=501, detail="JWT key generation is not available on this deployment")
+
     try:
         result = generate_jwt_secret()
         print(result)
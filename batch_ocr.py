@@ -0,0 +1,353 @@
+"""
+Offline batch OCR for archived ID scans (resumable):
+
+    python batch_ocr.py scans/ --output results.jsonl --workers 4
+    python batch_ocr.py manifest.csv --output results.parquet --workers 8 --prefetch 16
+
+A CSV manifest has `path` and `application_number` columns; for a directory
+the file name (without extension) is the application number. Finished items
+are appended to a checkpoint file (default: <output>.checkpoint) keyed by
+resolved path and application number, so a rerun with the same arguments
+skips them. When a worker process dies, the pool is rebuilt and the items that
+were in flight are run again one at a time; an item that crashes a worker on
+its own --max-crashes times (counted across runs in <checkpoint>.crashes) is
+recorded as an error instead of being retried forever.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+from image_io import check_image_header
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# ----------------------------------------------------------------------
+# 1. Inputs + Checkpoint
+# ----------------------------------------------------------------------
+def iter_items(source):
+    """Yield (path, application_number) from a directory (recursive) or a CSV manifest."""
+    if os.path.isdir(source):
+        for root, _dirs, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name), os.path.splitext(name)[0]
+        return
+
+    with open(source, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = {"path", "application_number"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"Manifest is missing column(s): {', '.join(sorted(missing))}")
+        base = os.path.dirname(os.path.abspath(source))
+        for row in reader:
+            path = row["path"] if os.path.isabs(row["path"]) else os.path.join(base, row["path"])
+            yield path, row["application_number"]
+
+
+def checkpoint_key(path, application_number):
+    # The file stem alone is not unique (a/123.jpg vs b/123.jpg, reused manifest numbers)
+    return f"{os.path.realpath(path)}\t{application_number}"
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def load_crashes(path):
+    """Checkpoint key -> number of times the item crashed a worker on its own."""
+    if not os.path.exists(path):
+        return Counter()
+    with open(path, encoding="utf-8") as f:
+        return Counter(line.rstrip("\n") for line in f if line.strip())
+
+
+# ----------------------------------------------------------------------
+# 2. Workers
+# ----------------------------------------------------------------------
+def _read(path):
+    """Prefetch thread: read the encoded file and validate its header (no full decode)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    check_image_header(data)
+    return data
+
+
+def _init_worker():
+    # One thread per process: --workers processes already fill the CPU, and
+    # torch / OpenCV each defaulting to every core would oversubscribe it
+    import cv2
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    # Models are loaded once per process, not per image
+    from worker_pool import _init_process_worker
+    _init_process_worker()
+
+
+def _ocr(data, application_number, persist):
+    """Worker process: the normal two-resolution pipeline on the encoded bytes."""
+    from utils import detect_and_process_id_card, build_id_response
+    import persistence
+    try:
+        result = detect_and_process_id_card(data, application_number, persist=persist)
+        return build_id_response(*result), None
+    except Exception as e:
+        return None, str(e)
+    finally:
+        if persist is not False:
+            persistence.writer.flush()  # worker processes may exit without draining the writer
+
+
+# ----------------------------------------------------------------------
+# 3. Output (JSONL lines or Parquet part files)
+# ----------------------------------------------------------------------
+class ResultWriter:
+    def __init__(self, path, checkpoint, part_rows=1000):
+        self.path = path
+        self.parquet = path.lower().endswith((".parquet", ".pq"))
+        self.part_rows = part_rows
+        self._rows = []
+        self._checkpoint = open(checkpoint, "a", encoding="utf-8")
+        if self.parquet:
+            os.makedirs(path, exist_ok=True)  # a directory of part files
+            self._file = None
+        else:
+            self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        if self.parquet:
+            self._rows.append(record)
+            if len(self._rows) >= self.part_rows:
+                self.flush()
+            return
+
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._mark_done([record])
+
+    def flush(self):
+        if not self.parquet or not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {
+            "application_number": [r["application_number"] for r in self._rows],
+            "path": [r["path"] for r in self._rows],
+            "status": [r["status"] for r in self._rows],
+            "error": [r["error"] for r in self._rows],
+            "result": [json.dumps(r["result"], ensure_ascii=False) if r["result"] else None for r in self._rows],
+        }
+        name = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{len(os.listdir(self.path)):05d}.parquet"
+        pq.write_table(pa.table(columns), os.path.join(self.path, name))
+        self._mark_done(self._rows)
+        self._rows = []
+
+    def _mark_done(self, records):
+        # Checkpoint only after the output is on disk (at-least-once on a crash)
+        keys = (checkpoint_key(r["path"], r["application_number"]) for r in records)
+        self._checkpoint.write("".join(f"{key}\n" for key in keys))
+        self._checkpoint.flush()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+        self._checkpoint.close()
+
+
+# ----------------------------------------------------------------------
+# 4. Pipeline
+# ----------------------------------------------------------------------
+def _prefetched(items, readers, window):
+    """Read files in `readers` threads, keeping up to `window` reads ahead, in input order."""
+    ahead = deque()
+    items = iter(items)
+    while True:
+        while len(ahead) < window:
+            try:
+                path, application_number = next(items)
+            except StopIteration:
+                break
+            ahead.append((path, application_number, readers.submit(_read, path)))
+        if not ahead:
+            return
+        path, application_number, future = ahead.popleft()
+        try:
+            yield path, application_number, future.result(), None
+        except Exception as e:
+            yield path, application_number, None, str(e)
+
+
+class Progress:
+    def __init__(self, total, every=10.0):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def update(self, ok):
+        self.done += 1
+        self.failed += int(not ok)
+        now = time.perf_counter()
+        if now - self._last >= self.every or self.done == self.total:
+            self._last = now
+            print(f"[INFO] {self.report()}")
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+        return (
+            f"{self.done}/{self.total} done ({self.failed} failed), "
+            f"{rate:.2f} img/s, ETA {time.strftime('%H:%M:%S', time.gmtime(remaining))}"
+        )
+
+
+def run(source, output, workers=None, prefetch=4, checkpoint=None, persist=False, progress_every=10.0,
+        max_crashes=3):
+    checkpoint = checkpoint or f"{output}.checkpoint"
+    done = load_checkpoint(checkpoint)
+    items = [item for item in iter_items(source) if checkpoint_key(*item) not in done]
+    workers = workers or config.POOL_WORKERS
+    print(f"[INFO] {len(items)} items to process ({len(done)} already done), {workers} workers")
+
+    crash_path = f"{checkpoint}.crashes"
+    crashes = load_crashes(crash_path)
+    writer = ResultWriter(output, checkpoint)
+    progress = Progress(len(items), progress_every)
+    in_flight = {}     # future -> (item, pool, alone); item = (path, application_number, data)
+    suspects = deque()  # items in flight when a worker died, re-run one at a time
+    pools = []
+
+    def new_pool():
+        if pools:
+            pools[-1].shutdown(wait=False, cancel_futures=True)
+        pools.append(ProcessPoolExecutor(max_workers=workers, initializer=_init_worker))
+
+    def submit(item, alone=False):
+        path, application_number, data = item
+        try:
+            future = pools[-1].submit(_ocr, data, application_number, persist)
+        except BrokenProcessPool:
+            new_pool()
+            future = pools[-1].submit(_ocr, data, application_number, persist)
+        in_flight[future] = (item, pools[-1], alone)
+
+    def write(path, application_number, result, error):
+        writer.write({
+            "application_number": application_number,
+            "path": path,
+            "status": "ok" if error is None else "error",
+            "error": error,
+            "result": result,
+        })
+        progress.update(error is None)
+
+    def crashed(item, pool, alone, e):
+        path, application_number, _data = item
+        if pool is pools[-1]:
+            new_pool()  # once per break: every future of the dead pool fails the same way
+        if not alone:
+            # Any of the items in flight may have killed the worker: re-run each on its own
+            suspects.append(item)
+            return
+
+        key = checkpoint_key(path, application_number)
+        crashes[key] += 1
+        with open(crash_path, "a", encoding="utf-8") as f:
+            f.write(f"{key}\n")
+        if crashes[key] >= max_crashes:
+            print(f"[WARN] {path} crashed a worker {crashes[key]} times; recording it as failed")
+            write(path, application_number, None, f"worker crashed {crashes[key]} times: {e!r}")
+        else:
+            print(f"[WARN] {path} crashed a worker ({crashes[key]}/{max_crashes}): {e!r}")
+            suspects.append(item)
+
+    def finish(future):
+        item, pool, alone = in_flight.pop(future)
+        try:
+            result, error = future.result()
+        except Exception as e:
+            # The worker died (e.g. BrokenProcessPool): not a verdict on the image yet
+            crashed(item, pool, alone, e)
+            return
+        write(item[0], item[1], result, error)
+
+    def wait_some():
+        completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in completed:
+            finish(future)
+
+    def settle():
+        """Finish everything in flight, running crash suspects one at a time."""
+        while in_flight or suspects:
+            if in_flight:
+                wait_some()
+            else:
+                submit(suspects.popleft(), alone=True)
+
+    new_pool()
+    try:
+        with ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="prefetch") as readers:
+            for path, application_number, data, error in _prefetched(items, readers, prefetch * 2):
+                if error is not None:
+                    write(path, application_number, None, error)
+                    continue
+
+                submit((path, application_number, data))
+                # Bounded: a couple of queued items per worker, so memory stays flat
+                while len(in_flight) >= workers * 2:
+                    wait_some()
+                if suspects:
+                    settle()
+            settle()
+    finally:
+        pools[-1].shutdown(wait=True, cancel_futures=True)
+        writer.close()
+
+    print(f"[INFO] Finished: {progress.report()}")
+    return progress.done, progress.failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumable offline OCR over a directory or CSV manifest")
+    parser.add_argument("source", help="Directory of images or CSV manifest (path, application_number)")
+    parser.add_argument("--output", required=True, help="results.jsonl, or results.parquet (directory of parts)")
+    parser.add_argument("--workers", type=int, default=None, help="OCR processes (default: OCR_POOL_WORKERS)")
+    parser.add_argument("--prefetch", type=int, default=4, help="File reader threads")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--persist", action="store_true", help="Also save artifacts (OCR_PERSIST_POLICY)")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--max-crashes", type=int, default=3,
+                        help="Record an item as failed after it crashes a worker this many times")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        print(f"⚠️ Source not found: {args.source}")
+        return 1
+
+    run(args.source, args.output, args.workers, args.prefetch, args.checkpoint,
+        persist=None if args.persist else False, progress_every=args.progress_every,
+        max_crashes=args.max_crashes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Benchmark harness.
+
+    python -m benchmarks generate --count 20 --out bench_images
+    python -m benchmarks stages --stub --cards 10 --output results.json
+    python -m benchmarks load --url http://127.0.0.1:8080 --concurrency 1 4 8 --output load.json
+    python -m benchmarks compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+
+
+def _parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def _meta(args):
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": {k: v for k, v in vars(args).items() if k != "func"},
+    }
+
+
+def _write(path, payload):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"✅ Results saved to {path}")
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+def cmd_generate(args):
+    from benchmarks.synthetic import generate_dataset
+    cards = generate_dataset(args.count, args.out, args.seed, _parse_size(args.photo_size), args.font)
+    with open(f"{args.out}/truth.json", "w", encoding="utf-8") as f:
+        json.dump([truth for _, truth in cards], f, indent=2, ensure_ascii=False)
+    print(f"✅ {len(cards)} synthetic cards written to {args.out}")
+
+
+def cmd_stages(args):
+    if args.stub:
+        from benchmarks.stubs import install_stub_models, install_stub_tesseract
+        install_stub_models(args.stub_latency_ms)
+        install_stub_tesseract(args.stub_latency_ms)
+
+    from benchmarks.synthetic import generate_dataset
+    from benchmarks.stages import run_stages
+    from model_registry import preload_models
+
+    preload_models()
+    cards = generate_dataset(args.cards, seed=args.seed, photo_size=_parse_size(args.photo_size),
+                             font_path=args.font)
+    stages, accuracy = run_stages(cards, iterations=args.iterations, warmup=args.warmup)
+
+    for stage, summary in stages.items():
+        print(f"{stage:<28} p50 {summary['p50_ms']:>9.2f} ms   p95 {summary['p95_ms']:>9.2f} ms")
+    print(f"[INFO] Accuracy: {accuracy}")
+
+    if args.output:
+        _write(args.output, {"meta": _meta(args), "stages": stages, "accuracy": accuracy})
+
+
+def cmd_load(args):
+    from benchmarks.synthetic import generate_dataset
+    from benchmarks.load import run_load
+
+    cards = generate_dataset(args.cards, seed=args.seed, photo_size=_parse_size(args.photo_size),
+                             font_path=args.font)
+    images = [cv2.imencode(".jpg", image)[1].tobytes() for image, _ in cards]
+    report = run_load(args.url, images, args.concurrency, args.requests, args.endpoint, args.timeout)
+
+    if args.output:
+        _write(args.output, {"meta": _meta(args), "load": report})
+
+
+def cmd_compare(args):
+    from benchmarks.compare import load_results, compare, print_comparison
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    print_comparison(baseline, current)
+    regressions = compare(baseline, current, args.threshold)
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for name, before, after in regressions:
+            print(f"   {name}: {before} -> {after}")
+        return 1
+
+    print("\n✅ No regressions")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_dataset_args(p):
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--photo-size", default="1600x1200", help="WIDTHxHEIGHT of the photo around the card")
+        p.add_argument("--font", default=None, help="TTF font with Arabic glyphs")
+
+    p = sub.add_parser("generate", help="write synthetic ID cards to a folder")
+    p.add_argument("--count", type=int, default=20)
+    p.add_argument("--out", default="bench_images")
+    add_dataset_args(p)
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("stages", help="time each pipeline stage")
+    p.add_argument("--cards", type=int, default=10)
+    p.add_argument("--iterations", type=int, default=3)
+    p.add_argument("--warmup", type=int, default=1)
+    p.add_argument("--stub", action="store_true", help="use stub models / Tesseract (no .pt weights needed)")
+    p.add_argument("--stub-latency-ms", type=float, default=0.0)
+    p.add_argument("--output", default=None)
+    add_dataset_args(p)
+    p.set_defaults(func=cmd_stages)
+
+    p = sub.add_parser("load", help="HTTP load test against a running server")
+    p.add_argument("--url", default="http://127.0.0.1:8080")
+    p.add_argument("--endpoint", default="/process-id-upload/")
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    p.add_argument("--requests", type=int, default=50, help="requests per concurrency level")
+    p.add_argument("--cards", type=int, default=10)
+    p.add_argument("--timeout", type=float, default=120)
+    p.add_argument("--output", default=None)
+    add_dataset_args(p)
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("compare", help="compare results against a stored baseline")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.10)
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import json
+
+# ----------------------------------------------------------------------
+# Baseline Comparison
+# ----------------------------------------------------------------------
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.10, metrics=("p50_ms", "p95_ms")):
+    """
+    Return a list of regressions: latency metrics that grew, or load
+    throughput that dropped, by more than `threshold` (a fraction).
+    """
+    regressions = []
+
+    for stage, base in baseline.get("stages", {}).items():
+        now = current.get("stages", {}).get(stage)
+        if now is None:
+            continue
+        for metric in metrics:
+            if base.get(metric) and now.get(metric, 0) > base[metric] * (1 + threshold):
+                regressions.append((f"stages.{stage}.{metric}", base[metric], now[metric]))
+
+    for level, base in baseline.get("load", {}).items():
+        now = current.get("load", {}).get(level)
+        if now is None:
+            continue
+        for metric in metrics:
+            if base.get(metric) and now.get(metric, 0) > base[metric] * (1 + threshold):
+                regressions.append((f"load.c{level}.{metric}", base[metric], now[metric]))
+        if base.get("throughput_rps") and \
+                now.get("throughput_rps", 0) < base["throughput_rps"] * (1 - threshold):
+            regressions.append((f"load.c{level}.throughput_rps", base["throughput_rps"], now["throughput_rps"]))
+
+    return regressions
+
+
+def print_comparison(baseline, current):
+    print(f"{'stage':<28}{'baseline p50':>14}{'current p50':>14}{'change':>10}")
+    for stage, base in baseline.get("stages", {}).items():
+        now = current.get("stages", {}).get(stage)
+        if now is None or not base.get("p50_ms"):
+            continue
+        change = (now["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100
+        print(f"{stage:<28}{base['p50_ms']:>14.2f}{now['p50_ms']:>14.2f}{change:>9.1f}%")
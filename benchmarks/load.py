@@ -0,0 +1,62 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stages import percentile
+
+# ----------------------------------------------------------------------
+# 1. Single Request
+# ----------------------------------------------------------------------
+def post_image(url, data, application_number, timeout):
+    request = urllib.request.Request(
+        f"{url}?application_number={application_number}",
+        data=data, method="POST", headers={"Content-Type": "image/jpeg"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+# ----------------------------------------------------------------------
+# 2. Load Levels
+# ----------------------------------------------------------------------
+def run_load(base_url, images, concurrency_levels=(1, 4, 8, 16), requests_per_level=50,
+             endpoint="/process-id-upload/", timeout=120):
+    """
+    POST the encoded `images` round-robin to `endpoint` at each concurrency
+    level. Reports latency percentiles over successful requests, throughput,
+    and how many requests were rejected (429/503) or failed.
+    """
+    url = base_url.rstrip("/") + endpoint
+    report = {}
+
+    for concurrency in concurrency_levels:
+        jobs = [(images[i % len(images)], f"LOAD-{concurrency}-{i}") for i in range(requests_per_level)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda job: post_image(url, job[0], job[1], timeout), jobs))
+        elapsed = time.perf_counter() - start
+
+        ok = [seconds * 1000 for status, seconds in outcomes if status == 200]
+        report[str(concurrency)] = {
+            "requests": len(outcomes),
+            "ok": len(ok),
+            "rejected": sum(1 for status, _ in outcomes if status in (429, 503)),
+            "errors": sum(1 for status, _ in outcomes if status not in (200, 429, 503)),
+            "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+            "p50_ms": round(percentile(ok, 0.50), 3),
+            "p95_ms": round(percentile(ok, 0.95), 3),
+            "p99_ms": round(percentile(ok, 0.99), 3),
+        }
+        print(f"[INFO] c={concurrency}: {report[str(concurrency)]}")
+
+    return report
@@ -0,0 +1,92 @@
+import time
+from collections import defaultdict
+
+import config
+from model_registry import ID_CARD_MODEL, FIELDS_MODEL, predict
+import utils
+
+TESSERACT_FIELDS = ("firstName", "lastName", "address")
+
+# ----------------------------------------------------------------------
+# 1. Statistics
+# ----------------------------------------------------------------------
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def summarize(seconds):
+    ms = [s * 1000 for s in seconds]
+    return {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "min_ms": round(min(ms), 3) if ms else 0.0,
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+# ----------------------------------------------------------------------
+# 2. Per-stage Timing
+# ----------------------------------------------------------------------
+def field_boxes(field_results):
+    return utils.best_field_boxes(field_results)
+
+
+def run_stages(cards, iterations=3, warmup=1):
+    """
+    Time every pipeline stage separately on each card, then the whole
+    pipeline end to end. Returns {stage: summary} plus accuracy counters.
+    """
+    timings = defaultdict(list)
+    accuracy = defaultdict(int)
+    cache_enabled, config.CACHE_ENABLED = config.CACHE_ENABLED, False
+
+    def timed(stage, record, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        if record:
+            timings[stage].append(time.perf_counter() - start)
+        return result
+
+    try:
+        for iteration in range(warmup + iterations):
+            record = iteration >= warmup
+            for image, truth in cards:
+                card_results = timed("card_detection", record, predict, ID_CARD_MODEL, image)
+                crop = utils.crop_id_card(image, card_results)
+
+                field_results = timed("field_detection", record, predict, FIELDS_MODEL, crop)
+                boxes = field_boxes(field_results)
+
+                denoised = timed("card_preprocess", record, utils.denoise_fields, crop,
+                                 [boxes[field] for field in TESSERACT_FIELDS if field in boxes])
+                for field in TESSERACT_FIELDS:
+                    if field in boxes:
+                        timed(f"tesseract_{field}", record, utils.extract_text_tesseract,
+                              crop, boxes[field], lang='ara', denoised=denoised)
+
+                if "nid" in boxes:
+                    timed("read_national_id", record, utils.read_national_id, crop, boxes["nid"])
+
+                if "serial" in boxes:
+                    x1, y1, x2, y2 = boxes["serial"]
+                    timed("read_factory_number", record,
+                          utils.read_factory_number, crop[y1:y2, x1:x2], localized=True)
+
+                result = timed("end_to_end", record,
+                               utils.detect_and_process_id_card, image, "benchmark", persist=False)
+                if record:
+                    accuracy["cards"] += 1
+                    accuracy["nid_correct"] += int(result[3] == truth["nid"])
+                    accuracy["serial_correct"] += int(result[5] == truth["serial"])
+    finally:
+        config.CACHE_ENABLED = cache_enabled
+
+    return {stage: summarize(values) for stage, values in timings.items()}, dict(accuracy)
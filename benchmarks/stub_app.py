@@ -0,0 +1,14 @@
+"""
+FastAPI app with stub model backends, for HTTP load tests without the .pt weights:
+
+    OCR_PERSIST_POLICY=off uvicorn benchmarks.stub_app:app --port 8080
+"""
+import os
+
+from benchmarks.stubs import install_stub_models, install_stub_tesseract
+
+_latency = float(os.getenv("OCR_BENCH_STUB_LATENCY_MS", "0"))
+install_stub_models(_latency)
+install_stub_tesseract(_latency)
+
+from app import app  # noqa: E402
@@ -0,0 +1,144 @@
+import time
+import cv2
+import numpy as np
+
+import model_registry
+import tesseract_engine
+from benchmarks.synthetic import FIELD_LAYOUT, FIELD_CLASSES
+from inference_client import tensor as _tensor
+
+# ----------------------------------------------------------------------
+# 1. Minimal stand-ins for ultralytics Results / Boxes
+# ----------------------------------------------------------------------
+class StubBox:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = _tensor([xyxy])
+        self.cls = _tensor([cls])
+        self.conf = _tensor([conf])
+
+
+class StubBoxes:
+    def __init__(self, boxes):
+        self._boxes = boxes
+        self.cls = np.array([b.cls[0] for b in boxes], dtype=np.float32)
+        self.conf = np.array([b.conf[0] for b in boxes], dtype=np.float32)
+        self.xyxy = np.array([b.xyxy[0] for b in boxes], dtype=np.float32).reshape(-1, 4)
+
+    def __iter__(self):
+        return iter(self._boxes)
+
+    def __len__(self):
+        return len(self._boxes)
+
+
+class StubResult:
+    def __init__(self, boxes, names):
+        self.boxes = StubBoxes(boxes)
+        self.names = names
+
+
+# ----------------------------------------------------------------------
+# 2. Stub Detectors (same call signature as a YOLO model)
+# ----------------------------------------------------------------------
+class StubDetector:
+    """Calls `detect(image) -> [(xyxy, cls, conf)]` per image and sleeps `latency_ms` per call."""
+
+    def __init__(self, detect, names, latency_ms=0.0):
+        self.detect = detect
+        self.names = names
+        self.latency = latency_ms / 1000.0
+
+    def __call__(self, source, verbose=False, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        for image in images:
+            if isinstance(image, str):
+                image = cv2.imread(image)
+            results.append(StubResult([StubBox(*d) for d in self.detect(image)], self.names))
+        return results
+
+
+def detect_card(image):
+    """The synthetic card is the only bright region on a dark background."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    mask = (gray > 150).astype(np.uint8)
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return []
+    x, y, w, h = cv2.boundingRect(points)
+    return [([x, y, x + w, y + h], 0, 0.99)]
+
+
+def detect_fields(image):
+    height, width = image.shape[:2]
+    class_ids = {name: cls for cls, name in FIELD_CLASSES.items()}
+    return [
+        ([x1 * width, y1 * height, x2 * width, y2 * height], class_ids[name], 0.95)
+        for name, (x1, y1, x2, y2) in FIELD_LAYOUT.items()
+    ]
+
+
+def make_digit_detector(national_id="29801011234561"):
+    def detect_digits(image):
+        height, width = image.shape[:2]
+        step = width / len(national_id)
+        return [
+            ([i * step, 0, (i + 1) * step, height], int(digit), 0.9)
+            for i, digit in enumerate(national_id)
+        ]
+    return detect_digits
+
+
+class StubReader:
+    """EasyOCR stand-in answering with a fixed serial."""
+
+    def __init__(self, text="AB1234567", latency_ms=0.0):
+        self.text = text
+        self.latency = latency_ms / 1000.0
+
+    def readtext(self, image, detail=1, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return [self.text] if detail == 0 else [([[0, 0]] * 4, self.text, 0.9)]
+
+    def recognize(self, image, horizontal_list=None, free_list=None, detail=1, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        boxes = horizontal_list or [[0, image.shape[1], 0, image.shape[0]]]
+        results = []
+        for x_min, x_max, y_min, y_max in boxes:
+            corners = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+            results.append((corners, self.text, 0.9) if detail else self.text)
+        return results
+
+
+# ----------------------------------------------------------------------
+# 3. Install
+# ----------------------------------------------------------------------
+def install_stub_models(latency_ms=0.0):
+    """Register stub backends for every model so benchmarks run without the .pt weights."""
+    names = dict(FIELD_CLASSES)
+    model_registry.register_model(
+        model_registry.ID_CARD_MODEL, lambda _n: StubDetector(detect_card, {0: "card"}, latency_ms)
+    )
+    model_registry.register_model(
+        model_registry.FIELDS_MODEL, lambda _n: StubDetector(detect_fields, names, latency_ms)
+    )
+    model_registry.register_model(
+        model_registry.DIGITS_MODEL,
+        lambda _n: StubDetector(make_digit_detector(), {i: str(i) for i in range(10)}, latency_ms)
+    )
+    model_registry.register_model(
+        model_registry.EASYOCR_READER, lambda _n: StubReader(latency_ms=latency_ms)
+    )
+
+
+def install_stub_tesseract(latency_ms=0.0):
+    def image_to_string(image, tess_config):
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+        return "نص"
+
+    tesseract_engine.register_backend(image_to_string)
@@ -0,0 +1,146 @@
+import os
+import random
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import national_id
+
+# ----------------------------------------------------------------------
+# 1. Card Layout (relative to the card, x1, y1, x2, y2)
+# ----------------------------------------------------------------------
+CARD_SIZE = (1000, 630)  # ID-1 aspect ratio
+
+FIELD_LAYOUT = {
+    "firstName": (0.42, 0.20, 0.95, 0.31),
+    "lastName": (0.30, 0.32, 0.95, 0.43),
+    "address": (0.30, 0.45, 0.95, 0.62),
+    "nid": (0.35, 0.76, 0.95, 0.87),
+    "serial": (0.03, 0.88, 0.32, 0.97),
+}
+
+FIELD_CLASSES = {0: "address", 1: "firstName", 2: "lastName", 3: "nid", 4: "serial"}
+
+FIRST_NAMES = ["أحمد", "محمد", "محمود", "مصطفى", "ياسر", "فاطمة", "مريم", "نور", "سارة", "عمر"]
+LAST_NAMES = ["محمد علي حسن", "إبراهيم السيد", "عبد الله فتحي", "حسين كامل", "عبد الرحمن سعيد"]
+ADDRESSES = ["١٢ شارع التحرير الدقي الجيزة", "٤ شارع النصر مدينة نصر القاهرة",
+             "ش الجمهورية المنصورة الدقهلية", "٣٠ ش بورسعيد الإسكندرية"]
+GOVERNORATE_CODES = ["01", "02", "12", "13", "21", "88"]
+
+ARABIC_DIGITS = str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩")
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+
+def load_font(size, font_path=None):
+    for path in [font_path] + FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default()
+
+
+# ----------------------------------------------------------------------
+# 2. Ground-truth Values
+# ----------------------------------------------------------------------
+def random_national_id(rng):
+    century = rng.choice("23")
+    year = rng.randint(0, 99) if century == "2" else rng.randint(0, 9)
+    nid = (
+        f"{century}{year:02d}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        f"{rng.choice(GOVERNORATE_CODES)}{rng.randint(0, 9999):04d}"
+    )
+    return nid + str(check_digit(nid))
+
+
+def check_digit(first_13):
+    weights = national_id.CHECK_WEIGHTS
+    return (11 - sum(int(d) * int(w) for d, w in zip(first_13, weights)) % 11) % 10
+
+
+def random_serial(rng):
+    letters = "ABCDEFGHJKLMNPRSTUVWXYZ"
+    return f"{rng.choice(letters)}{rng.choice(letters)}{rng.randint(0, 9999999):07d}"
+
+
+# ----------------------------------------------------------------------
+# 3. Card Rendering
+# ----------------------------------------------------------------------
+def render_card(values, font_path=None, rng=None):
+    rng = rng or random.Random()
+    width, height = CARD_SIZE
+    card = Image.new("RGB", CARD_SIZE, (236, 232, 220))
+    draw = ImageDraw.Draw(card)
+
+    # Photo placeholder + a little texture so preprocessing has something to do
+    draw.rectangle([int(0.04 * width), int(0.18 * height), int(0.26 * width), int(0.74 * height)],
+                   fill=(170, 170, 175))
+    for _ in range(300):
+        x, y = rng.randint(0, width - 1), rng.randint(0, height - 1)
+        draw.point((x, y), fill=(210, 205, 195))
+
+    texts = {
+        "firstName": values["firstName"],
+        "lastName": values["lastName"],
+        "address": values["address"],
+        "nid": values["nid"].translate(ARABIC_DIGITS),
+        "serial": values["serial"],
+    }
+    for field, (x1, y1, x2, y2) in FIELD_LAYOUT.items():
+        box_h = int((y2 - y1) * height)
+        font = load_font(int(box_h * 0.6), font_path)
+        anchor_x = int(x2 * width) - 8 if field != "serial" else int(x1 * width) + 8
+        anchor = "rm" if field != "serial" else "lm"
+        draw.text((anchor_x, int((y1 + y2) / 2 * height)), texts[field],
+                  fill=(20, 20, 20), font=font, anchor=anchor)
+
+    return cv2.cvtColor(np.asarray(card), cv2.COLOR_RGB2BGR)
+
+
+def generate_card(seed=None, photo_size=(1600, 1200), font_path=None):
+    """
+    Return (bgr_image, truth). The card sits at a random position and scale on
+    a dark, noisy background the size of a phone photo.
+    """
+    rng = random.Random(seed)
+    values = {
+        "firstName": rng.choice(FIRST_NAMES),
+        "lastName": rng.choice(LAST_NAMES),
+        "address": rng.choice(ADDRESSES),
+        "nid": random_national_id(rng),
+        "serial": random_serial(rng),
+    }
+    card = render_card(values, font_path, rng)
+
+    photo_w, photo_h = photo_size
+    scale = rng.uniform(0.55, 0.8) * photo_w / CARD_SIZE[0]
+    card_w, card_h = int(CARD_SIZE[0] * scale), int(CARD_SIZE[1] * scale)
+    card_w, card_h = min(card_w, photo_w - 2), min(card_h, photo_h - 2)
+    card = cv2.resize(card, (card_w, card_h), interpolation=cv2.INTER_AREA)
+
+    photo = np.random.default_rng(seed).integers(20, 70, (photo_h, photo_w, 3), dtype=np.uint8)
+    x0 = rng.randint(0, photo_w - card_w)
+    y0 = rng.randint(0, photo_h - card_h)
+    photo[y0:y0 + card_h, x0:x0 + card_w] = card
+
+    truth = dict(values, card_box=[x0, y0, x0 + card_w, y0 + card_h])
+    return photo, truth
+
+
+def generate_dataset(count, out_dir=None, seed=0, photo_size=(1600, 1200), font_path=None):
+    """Generate `count` cards; when `out_dir` is given they are also written as JPEGs."""
+    cards = []
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    for i in range(count):
+        image, truth = generate_card(seed + i, photo_size, font_path)
+        if out_dir:
+            path = os.path.join(out_dir, f"synthetic_{i:04d}.jpg")
+            cv2.imwrite(path, image)
+            truth["path"] = path
+        cards.append((image, truth))
+    return cards
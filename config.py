@@ -0,0 +1,212 @@
+import os
+
+# ----------------------------------------------------------------------
+# Environment helpers
+# ----------------------------------------------------------------------
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    if not value:
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# ----------------------------------------------------------------------
+# 1. Model Loading
+# ----------------------------------------------------------------------
+# Directory holding detect_id_card.pt / detect_odjects.pt / detect_id.pt
+MODEL_DIR = os.getenv("OCR_MODEL_DIR", ".")
+
+# True  -> load every model (and warm it up) when the worker starts
+# False -> load each model lazily on first use
+PRELOAD_MODELS = _env_bool("OCR_PRELOAD_MODELS", True)
+WARMUP_MODELS = _env_bool("OCR_WARMUP_MODELS", True)
+
+EASYOCR_LANGS = _env_list("OCR_EASYOCR_LANGS", ["en"])
+EASYOCR_GPU = _env_bool("OCR_EASYOCR_GPU", False)
+
+# ----------------------------------------------------------------------
+# 2. Worker Pool / Admission Control
+# ----------------------------------------------------------------------
+# "thread" shares the preloaded models; "process" loads them once per child
+POOL_KIND = os.getenv("OCR_POOL_KIND", "thread")
+POOL_WORKERS = _env_int("OCR_POOL_WORKERS", min(4, os.cpu_count() or 1))
+# Jobs allowed to wait for a free worker before requests are rejected
+POOL_QUEUE_SIZE = _env_int("OCR_POOL_QUEUE_SIZE", 16)
+POOL_RETRY_AFTER = _env_int("OCR_POOL_RETRY_AFTER", 5)
+# 503 (Service Unavailable) or 429 (Too Many Requests)
+POOL_REJECT_STATUS = _env_int("OCR_POOL_REJECT_STATUS", 503)
+# Fields OCR'd at the same time inside one request (1 = one after another);
+# total OCR threads are roughly POOL_WORKERS * FIELD_WORKERS
+FIELD_WORKERS = _env_int("OCR_FIELD_WORKERS", 3)
+
+# ----------------------------------------------------------------------
+# 3. Batch Endpoint
+# ----------------------------------------------------------------------
+BATCH_MAX_ITEMS = _env_int("OCR_BATCH_MAX_ITEMS", 64)
+# Images per YOLO forward pass inside a batch
+BATCH_INFER_SIZE = _env_int("OCR_BATCH_INFER_SIZE", 16)
+
+# ----------------------------------------------------------------------
+# 4. Artifact Persistence
+# ----------------------------------------------------------------------
+# Cropped card, annotated image and label JSON:
+# "off", "sampled" (PERSIST_SAMPLE_PERCENT of requests), "on_error" or "always"
+SAVE_ARTIFACTS = _env_bool("OCR_SAVE_ARTIFACTS", True)  # legacy switch, false = "off"
+ARTIFACTS_DIR = os.getenv("OCR_ARTIFACTS_DIR", "D:/egyption id" if os.name == "nt" else "artifacts")
+PERSIST_POLICY = os.getenv("OCR_PERSIST_POLICY", "always" if SAVE_ARTIFACTS else "off")
+PERSIST_SAMPLE_PERCENT = _env_float("OCR_PERSIST_SAMPLE_PERCENT", 5.0)
+# Writes waiting for the background writer; extra artifacts are dropped
+PERSIST_QUEUE_SIZE = _env_int("OCR_PERSIST_QUEUE_SIZE", 256)
+
+# ----------------------------------------------------------------------
+# 5. Tesseract Engine
+# ----------------------------------------------------------------------
+# "auto" uses tesserocr (persistent C API engines) when installed,
+# "pytesseract" forces one tesseract subprocess per call
+TESSERACT_ENGINE = os.getenv("OCR_TESSERACT_ENGINE", "auto")
+# Engines kept alive per Tesseract config (e.g. one pool for "-l ara")
+TESSERACT_POOL_SIZE = _env_int("OCR_TESSERACT_POOL_SIZE", POOL_WORKERS * max(1, FIELD_WORKERS))
+TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX")
+# Seconds a call waits for a busy engine before failing (never blocks forever)
+TESSERACT_ACQUIRE_TIMEOUT = _env_float("OCR_TESSERACT_ACQUIRE_TIMEOUT", 30.0)
+# tesseract binary for the pytesseract fallback; unset = "tesseract" on PATH.
+# Set it for a custom install, e.g. C:\Program Files\Tesseract-OCR\tesseract.exe
+TESSERACT_CMD = os.getenv("OCR_TESSERACT_CMD") or None
+
+# ----------------------------------------------------------------------
+# 6. Factory Number Variants
+# ----------------------------------------------------------------------
+# Variants recognised together in the first batched round (best first)
+FACTORY_FIRST_ROUND = _env_int("OCR_FACTORY_FIRST_ROUND", 2)
+# Fall back to full EasyOCR detect + recognise when batched rounds miss
+FACTORY_DETECT_FALLBACK = _env_bool("OCR_FACTORY_DETECT_FALLBACK", True)
+
+# ----------------------------------------------------------------------
+# 7. Uploads
+# ----------------------------------------------------------------------
+UPLOAD_MAX_BYTES = _env_int("OCR_UPLOAD_MAX_BYTES", 20 * 1024 * 1024)
+# Checked from the image header before the full decode (48 MP phones + margin)
+UPLOAD_MAX_PIXELS = _env_int("OCR_UPLOAD_MAX_PIXELS", 60_000_000)
+# Card detection runs on a reduced decode whose long side stays >= this
+# (JPEG DCT scaling 1/2, 1/4, 1/8); only the card is cropped at full size. 0 = off
+DETECT_MAX_SIDE = _env_int("OCR_DETECT_MAX_SIDE", 1280)
+
+# ----------------------------------------------------------------------
+# 8. Result Cache
+# ----------------------------------------------------------------------
+CACHE_ENABLED = _env_bool("OCR_CACHE_ENABLED", True)
+CACHE_MAX_ENTRIES = _env_int("OCR_CACHE_MAX_ENTRIES", 1024)
+CACHE_TTL = _env_int("OCR_CACHE_TTL", 24 * 3600)  # seconds, 0 = never expire
+# Also match re-encoded copies by perceptual hash (Hamming distance <= N)
+CACHE_PHASH = _env_bool("OCR_CACHE_PHASH", False)
+CACHE_PHASH_DISTANCE = _env_int("OCR_CACHE_PHASH_DISTANCE", 0)
+# Optional SQLite file for a cache tier that survives restarts
+CACHE_DB_PATH = os.getenv("OCR_CACHE_DB_PATH", "")
+CACHE_DISK_MAX_ENTRIES = _env_int("OCR_CACHE_DISK_MAX_ENTRIES", 100_000)
+
+# ----------------------------------------------------------------------
+# 9. Asynchronous Jobs
+# ----------------------------------------------------------------------
+JOBS_ENABLED = _env_bool("OCR_JOBS_ENABLED", True)
+JOBS_DB_PATH = os.getenv("OCR_JOBS_DB_PATH", "jobs.sqlite3")
+# Background tasks pulling jobs; each still goes through the OCR worker pool
+JOBS_WORKERS = _env_int("OCR_JOBS_WORKERS", POOL_WORKERS)
+JOBS_POLL_INTERVAL = _env_float("OCR_JOBS_POLL_INTERVAL", 1.0)
+JOBS_CALLBACK_TIMEOUT = _env_float("OCR_JOBS_CALLBACK_TIMEOUT", 10.0)
+# A running job whose owner has not sent a heartbeat for this long is queued again
+JOBS_STALE_AFTER = _env_float("OCR_JOBS_STALE_AFTER", 60.0)
+
+# ----------------------------------------------------------------------
+# 10. Metrics / Tracing
+# ----------------------------------------------------------------------
+# Allow clients to request a per-stage timing trace ("debug_trace": true)
+TRACE_ENABLED = _env_bool("OCR_TRACE_ENABLED", True)
+
+# ----------------------------------------------------------------------
+# 11. National ID Digits
+# ----------------------------------------------------------------------
+# Digit model runs on the nid box padded by this fraction of its height,
+# at a small inference size (a 14-digit strip needs far less than the card)
+NID_PAD = _env_float("OCR_NID_PAD", 0.15)
+NID_IMGSZ = _env_int("OCR_NID_IMGSZ", 320)
+# Checks a recognised ID must pass before the retry cascade is skipped
+NID_GATE = _env_list("OCR_NID_GATE", ["format", "century", "date", "governorate", "check_digit"])
+# Retries on the nid field only: larger input + lower confidence, enhanced /
+# deskewed crop, then Tesseract digits-only; no new attempt after the budget
+NID_RETRY_ENABLED = _env_bool("OCR_NID_RETRY_ENABLED", True)
+NID_RETRY_IMGSZ = _env_int("OCR_NID_RETRY_IMGSZ", 640)
+NID_RETRY_CONF = _env_float("OCR_NID_RETRY_CONF", 0.1)
+NID_RETRY_BUDGET_MS = _env_int("OCR_NID_RETRY_BUDGET_MS", 1500)
+# IDs accepted by one /decode-nid-batch/ call
+NID_BATCH_MAX_ITEMS = _env_int("OCR_NID_BATCH_MAX_ITEMS", 100_000)
+
+# ----------------------------------------------------------------------
+# 12. Detector Backend
+# ----------------------------------------------------------------------
+# "torch" (the .pt files), "onnx" (ONNX Runtime) or "openvino";
+# exports come from `python detector_export.py`
+DETECTOR_BACKEND = os.getenv("OCR_DETECTOR_BACKEND", "torch")
+# Load the INT8-quantised export instead of the FP32 one
+DETECTOR_INT8 = _env_bool("OCR_DETECTOR_INT8", False)
+
+# ----------------------------------------------------------------------
+# 13. Shared Inference Server
+# ----------------------------------------------------------------------
+# Unix socket of inference_server.py; when set, workers forward all model
+# calls there instead of loading their own copies
+INFERENCE_SOCKET = os.getenv("OCR_INFERENCE_SOCKET", "")
+# Micro-batching: wait up to this long, or until this many images, per pass
+INFERENCE_MAX_WAIT_MS = _env_float("OCR_INFERENCE_MAX_WAIT_MS", 5.0)
+INFERENCE_MAX_BATCH = _env_int("OCR_INFERENCE_MAX_BATCH", 16)
+INFERENCE_TIMEOUT = _env_float("OCR_INFERENCE_TIMEOUT", 30.0)
+# Shared secret for the socket; unset = the server writes a random key to
+# <socket>.key (mode 0600) and workers running as the same user read it
+INFERENCE_AUTHKEY = os.getenv("OCR_INFERENCE_AUTHKEY", "")
+
+# ----------------------------------------------------------------------
+# 14. Arabic Spell Correction
+# ----------------------------------------------------------------------
+# Names / places lexicon ("word" or "word count" per line) and the
+# memory-mapped symmetric-delete index built from it (built on first use)
+SPELL_LEXICON = os.getenv("OCR_SPELL_LEXICON", "lexicon/egyptian_names_places.txt")
+SPELL_INDEX_PATH = os.getenv("OCR_SPELL_INDEX_PATH", "lexicon/egyptian_names_places.symspell")
+SPELL_MAX_DISTANCE = _env_int("OCR_SPELL_MAX_DISTANCE", 2)
+# Deletes are generated from the first N characters only (keeps the index small)
+SPELL_PREFIX_LENGTH = _env_int("OCR_SPELL_PREFIX_LENGTH", 7)
+# An unknown word is replaced only by a candidate this many times more frequent
+# than the runner-up and than a typical (median) lexicon word
+SPELL_MIN_RATIO = _env_float("OCR_SPELL_MIN_RATIO", 2.0)
+# Correct firstName / lastName / address in the OCR results
+SPELL_CORRECT_FIELDS = _env_bool("OCR_SPELL_CORRECT_FIELDS", False)
+
+# ----------------------------------------------------------------------
+# 15. Field Preprocessing
+# ----------------------------------------------------------------------
+# Edge-preserving filter run once per card crop before the Tesseract fields:
+# "bilateral", "median", "guided" (opencv-contrib) or "none"
+DENOISE_FILTER = os.getenv("OCR_DENOISE_FILTER", "bilateral")
+# Bilateral diameter (11, as the per-field filter used) / median aperture / guided radius.
+# Smaller is much faster but changes what Tesseract sees; measure accuracy first
+DENOISE_SIZE = _env_int("OCR_DENOISE_SIZE", 11)
+DENOISE_SIGMA = _env_float("OCR_DENOISE_SIGMA", 17.0)
+# Per-field binarisation: "otsu" (one threshold per field) or "adaptive"
+FIELD_THRESHOLD = os.getenv("OCR_FIELD_THRESHOLD", "otsu")
+FIELD_THRESHOLD_BLOCK = _env_int("OCR_FIELD_THRESHOLD_BLOCK", 31)
+FIELD_THRESHOLD_C = _env_float("OCR_FIELD_THRESHOLD_C", 10.0)
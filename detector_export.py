@@ -0,0 +1,229 @@
+"""
+Export the three YOLO detectors for the ONNX Runtime / OpenVINO CPU backends
+and check that the exported models agree with PyTorch:
+
+    python detector_export.py --format onnx
+    python detector_export.py --format onnx --int8
+    python detector_export.py --format openvino --int8 --data calibration.yaml
+    python detector_export.py --format onnx --int8 --parity-only --images bench_images
+
+Then serve them with OCR_DETECTOR_BACKEND=onnx (or openvino) and
+OCR_DETECTOR_INT8=true.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+
+import cv2
+import numpy as np
+
+import config
+from model_registry import ID_CARD_MODEL, FIELDS_MODEL, DIGITS_MODEL, YOLO_MODELS, exported_path
+
+# ----------------------------------------------------------------------
+# 1. Export
+# ----------------------------------------------------------------------
+def export_model(name, fmt, int8=False, imgsz=640, data=None):
+    """
+    Export `name` to `fmt` ("onnx" / "openvino") next to the .pt file.
+    ONNX INT8 uses dynamic (weight-only) quantisation from onnxruntime;
+    OpenVINO INT8 uses NNCF post-training quantisation on `data`.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(os.path.join(config.MODEL_DIR, name))
+    target = exported_path(name, fmt, int8)
+
+    if fmt == "onnx":
+        # dynamic axes: the nid strip runs at OCR_NID_IMGSZ, the cards at 640
+        fp32_path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(fp32_path, target, weight_type=QuantType.QUInt8)
+        elif os.path.abspath(fp32_path) != os.path.abspath(target):
+            shutil.move(fp32_path, target)
+
+    elif fmt == "openvino":
+        kwargs = {"format": "openvino", "imgsz": imgsz, "dynamic": True, "int8": int8}
+        if data:
+            kwargs["data"] = data
+        out_dir = model.export(**kwargs)
+        if os.path.abspath(out_dir.rstrip(os.sep)) != os.path.abspath(target):
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.move(out_dir, target)
+
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    print(f"[INFO] Exported {name} -> {target}")
+    return target
+
+
+# ----------------------------------------------------------------------
+# 2. Parity Check (exported vs PyTorch on the inputs each stage sees)
+# ----------------------------------------------------------------------
+def _detections(results):
+    boxes = results[0].boxes
+    return (
+        np.asarray(boxes.xyxy.cpu()).reshape(-1, 4),
+        np.asarray(boxes.cls.cpu()).astype(int),
+        np.asarray(boxes.conf.cpu()),
+    )
+
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare_detections(reference, candidate, min_iou=0.8):
+    """Greedy same-class matching; returns matched / missing / extra counts and IoU / conf drift."""
+    ref_boxes, ref_cls, ref_conf = reference
+    cand_boxes, cand_cls, cand_conf = candidate
+    used = set()
+    ious, conf_diffs = [], []
+
+    for i in np.argsort(-ref_conf):
+        best, best_iou = None, min_iou
+        for j in range(len(cand_boxes)):
+            if j in used or cand_cls[j] != ref_cls[i]:
+                continue
+            iou = _iou(ref_boxes[i], cand_boxes[j])
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        if best is not None:
+            used.add(best)
+            ious.append(best_iou)
+            conf_diffs.append(abs(float(ref_conf[i]) - float(cand_conf[best])))
+
+    return {
+        "matched": len(ious),
+        "missing": len(ref_boxes) - len(ious),
+        "extra": len(cand_boxes) - len(used),
+        "ious": ious,
+        "conf_diffs": conf_diffs,
+    }
+
+
+def _best_crop(image, detections):
+    boxes, _cls, conf = detections
+    if not len(boxes):
+        return None
+    x1, y1, x2, y2 = map(int, boxes[int(np.argmax(conf))])
+    return image[max(0, y1):y2, max(0, x1):x2]
+
+
+def _nid_strip(card, field_results):
+    from utils import nid_region, best_field_boxes
+    bbox = best_field_boxes(field_results).get('nid')
+    return None if bbox is None else nid_region(card, bbox)
+
+
+def stage_inputs(images, torch_models):
+    """Cards for the card model, card crops for the field model, padded nid strips for the digits."""
+    inputs = {ID_CARD_MODEL: list(images), FIELDS_MODEL: [], DIGITS_MODEL: []}
+
+    for image in images:
+        card = _best_crop(image, _detections(torch_models[ID_CARD_MODEL](image, verbose=False)))
+        if card is None or not card.size:
+            continue
+        inputs[FIELDS_MODEL].append(card)
+        strip = _nid_strip(card, torch_models[FIELDS_MODEL](card, verbose=False))
+        if strip is not None:
+            inputs[DIGITS_MODEL].append(strip)
+    return inputs
+
+
+def parity_check(images, backend, int8=False, names=YOLO_MODELS, min_iou=0.8):
+    from ultralytics import YOLO
+
+    torch_models = {n: YOLO(os.path.join(config.MODEL_DIR, n)) for n in YOLO_MODELS}
+    inputs = stage_inputs(images, torch_models)
+    report = {}
+
+    for name in names:
+        exported = YOLO(exported_path(name, backend, int8), task="detect")
+        imgsz = config.NID_IMGSZ if name == DIGITS_MODEL else 640
+        totals = {"images": 0, "matched": 0, "missing": 0, "extra": 0}
+        ious, conf_diffs = [], []
+
+        for image in inputs[name]:
+            reference = _detections(torch_models[name](image, imgsz=imgsz, verbose=False))
+            candidate = _detections(exported(image, imgsz=imgsz, verbose=False))
+            result = compare_detections(reference, candidate, min_iou)
+            totals["images"] += 1
+            for key in ("matched", "missing", "extra"):
+                totals[key] += result[key]
+            ious.extend(result["ious"])
+            conf_diffs.extend(result["conf_diffs"])
+
+        reference_boxes = totals["matched"] + totals["missing"]
+        totals["recall"] = round(totals["matched"] / reference_boxes, 4) if reference_boxes else 1.0
+        totals["mean_iou"] = round(float(np.mean(ious)), 4) if ious else None
+        totals["max_conf_diff"] = round(float(np.max(conf_diffs)), 4) if conf_diffs else None
+        report[name] = totals
+        print(f"[INFO] {name}: {totals}")
+
+    return report
+
+
+def load_images(path=None, count=20):
+    """Images from a directory, or synthetic cards when no directory is given."""
+    if path:
+        files = sorted(
+            f for f in glob.glob(os.path.join(path, "*"))
+            if f.lower().endswith((".jpg", ".jpeg", ".png", ".bmp", ".webp"))
+        )[:count]
+        return [image for image in (cv2.imread(f) for f in files) if image is not None]
+
+    from benchmarks.synthetic import generate_dataset
+    return [image for image, _truth in generate_dataset(count)]
+
+
+# ----------------------------------------------------------------------
+# 3. Command Line
+# ----------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the YOLO detectors and check parity")
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--int8", action="store_true", help="Export INT8 instead of FP32")
+    parser.add_argument("--data", help="Calibration dataset YAML (OpenVINO INT8)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--models", nargs="+", default=list(YOLO_MODELS), choices=list(YOLO_MODELS))
+    parser.add_argument("--images", help="Directory of sample photos for the parity check (default: synthetic)")
+    parser.add_argument("--count", type=int, default=20, help="Sample images for the parity check")
+    parser.add_argument("--min-iou", type=float, default=0.8)
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Fail below this box recall")
+    parser.add_argument("--parity-only", action="store_true", help="Skip the export step")
+    parser.add_argument("--skip-parity", action="store_true")
+    parser.add_argument("--output", help="Write the parity report as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.parity_only:
+        for name in args.models:
+            export_model(name, args.format, args.int8, args.imgsz, args.data)
+
+    if args.skip_parity:
+        return 0
+
+    images = load_images(args.images, args.count)
+    report = parity_check(images, args.format, args.int8, args.models, args.min_iou)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [name for name, totals in report.items() if totals["recall"] < args.min_recall]
+    if failed:
+        print(f"⚠️ Parity below {args.min_recall} recall for: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Progress events from the OCR pipeline (used by /process-id-stream/).
+
+The pipeline calls `emit(event, data)` as each stage finishes; it is a no-op
+unless the call runs under `streamed(...)`. Like the stage traces in
+metrics.py, the listener lives in a context variable, so it follows the
+request into the field helper threads (worker_pool.run_parallel).
+"""
+import asyncio
+import contextvars
+import threading
+
+_listener = contextvars.ContextVar("ocr_event_listener", default=None)
+
+
+class StreamCancelled(Exception):
+    """The client stopped listening; raised at the next event to free the worker."""
+
+
+def emit(event, data):
+    listener = _listener.get()
+    if listener is not None:
+        listener(event, data)
+
+
+def check():
+    """Raise StreamCancelled when the client is gone (for loops between events)."""
+    listener = _listener.get()
+    if listener is not None and listener.cancelled.is_set():
+        raise StreamCancelled()
+
+
+def streamed(listener, fn, *args, **kwargs):
+    """Run `fn` with `listener(event, data)` receiving its events."""
+    token = _listener.set(listener)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _listener.reset(token)
+
+
+class EventStream:
+    """Listener that hands events from a worker thread to an asyncio queue."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self.queue = asyncio.Queue()
+        self.cancelled = threading.Event()
+
+    def __call__(self, event, data):
+        if self.cancelled.is_set():
+            raise StreamCancelled()
+        self._loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def cancel(self):
+        self.cancelled.set()
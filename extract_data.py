@@ -1,63 +1,255 @@
+"""
+Export Notion pages (insurance product configuration) to JSONL with a headless browser:
+
+    NOTION_TOKEN_V2=... python extract_data.py --pages pages.txt --output notion.jsonl --concurrency 4
+    python extract_data.py https://www.notion.so/axxis/<page> --full
+
+A bounded pool of browser contexts loads the pages in parallel. A page is read
+once its content root (--ready-selector) is attached and its text has stopped
+changing for --settle-ms, instead of after a fixed sleep. The state file
+(default: <output>.state.json) makes reruns incremental: before rendering, a
+plain conditional GET checks the page, and it is skipped without a browser tab
+when the server answers 304 to its stored ETag / Last-Modified or serves the
+same HTML as last time. Pages that do render are still skipped when the hash of
+their text is unchanged. --full exports every page again; --always-render skips
+the HTML comparison for sites whose served HTML is an app shell that does not
+change with the content. Exported pages are
+appended to the JSONL output as they finish (the latest line for a URL wins).
+
+Without Notion, against a local static server:
+
+    python -m http.server 8000 --directory sample_pages
+    python extract_data.py http://127.0.0.1:8000/a.html http://127.0.0.1:8000/b.html --ready-selector body
+"""
+import argparse
 import asyncio
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-
-# Your Notion token_v2 cookie from the browser
-TOKEN = "v03%3AeyJhbGciOiJkaXIiLCJraWQiOiJwcm9kdWN0aW9uOnRva2VuLXYzOjIwMjQtMTEtMDciLCJlbmMiOiJBMjU2Q0JDLUhTNTEyIn0..IgG8Uk5mVpmS7hhUzVAIYw.QskmSt7MUueGgNM0gu6UQL4YVZWoYfF4KXA7VQ2FX4NygMZcxYpSqZ4MAG7Au5Ja_J0V8YxnGGJBWjy9MkpM2o8qaQNbWgb26e_x6-DL8CHcvC_GF62BtbtM8uD_MJQcj4fW80zn3QJTCHk1SYWIg93kkKMfGtUvcNUsYkPIacQw7JzWp6vYllewS3j7XoO43egTt_nT5pHospVwnOuRTXFx41dlbolbXfbmdAxiuf3RKsJYhl_equ8vFI2OtmrUVhiHN3aK5uyry3gmVwgngWg_M6h5f0wmy7wxU98UxxFmda9TBlH8Alu33CbSJbu71x3U0A-SPJvgtaLrqYqTGGWAgTbdjnqSnao5ivyEcRbo_amRZt8cAIMjoGLXl1gG.4HIr_k2o1IM7a_5gkquAr9Hs8kOPABwa9K1YDdlUrMw"
-URL = "https://www.notion.so/axxis/Insurance-Product-Configuration-43bde923d3a9406e915974653fc71504"
-
-async def scrape_notion():
-    async with async_playwright() as p:
-        # Launch Chromium in headless mode
-        browser = await p.chromium.launch(headless=True)
-
-        # Create a browser context with authentication
-        context = await browser.new_context(
-            storage_state={
-                "cookies": [{
-                    "name": "token_v2",
-                    "value": TOKEN,
-                    "domain": ".notion.so",
-                    "path": "/"
-                }]
-            }
-        )
-
-        # Open a new page
-        page = await context.new_page()
-        print(f"🔄 Opening {URL} ...")
-
-        # ✅ FIX 1: Use "domcontentloaded" instead of "networkidle"
-        # ✅ FIX 2: Increase timeout to 2 minutes
-        await page.goto(URL, wait_until="domcontentloaded", timeout=120000)
-
-        # ✅ FIX 3: Wait 5 extra seconds for lazy-loaded content
-        await page.wait_for_timeout(5000)
-
-        # Get the rendered HTML
+import hashlib
+import json
+import os
+import sys
+import time
+from urllib.parse import urlparse
+
+DEFAULT_URL = "https://www.notion.so/axxis/Insurance-Product-Configuration-43bde923d3a9406e915974653fc71504"
+# token_v2 cookie of a logged-in browser session, never kept in the source
+TOKEN_ENV = "NOTION_TOKEN_V2"
+
+# ----------------------------------------------------------------------
+# 1. Pages + State (incremental runs)
+# ----------------------------------------------------------------------
+def read_pages(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    # Replaced atomically, so an interrupted run keeps the previous state
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def auth_cookies(urls, token):
+    """token_v2 cookie for every host in `urls` (.notion.so for Notion pages)."""
+    if not token:
+        return []
+    domains = set()
+    for url in urls:
+        host = urlparse(url).hostname
+        if host:
+            domains.add(".notion.so" if host.endswith("notion.so") else host)
+    return [{"name": "token_v2", "value": token, "domain": domain, "path": "/"} for domain in sorted(domains)]
+
+
+# ----------------------------------------------------------------------
+# 2. One Page
+# ----------------------------------------------------------------------
+# True once the page text length has not changed for settleMs (lazy-loaded blocks)
+_SETTLED = """([settleMs]) => {
+    const length = document.body ? document.body.innerText.length : 0;
+    const now = performance.now();
+    if (window.__exportLength !== length) {
+        window.__exportLength = length;
+        window.__exportChanged = now;
+        return false;
+    }
+    return now - window.__exportChanged >= settleMs;
+}"""
+
+
+async def wait_until_ready(page, selector, settle_ms, timeout_ms):
+    await page.wait_for_selector(selector, state="attached", timeout=timeout_ms)
+    await page.wait_for_function(_SETTLED, arg=[settle_ms], polling=100, timeout=timeout_ms)
+
+
+def _validators(headers):
+    return {"etag": headers.get("etag"), "last_modified": headers.get("last-modified")}
+
+
+async def check_unchanged(context, url, previous, options):
+    """
+    Cheap pre-check without rendering: a conditional GET with the stored
+    validators (shares the context cookies). Returns ("not_modified" or
+    "unchanged", state entry) when the page can be skipped, else (None, None).
+    """
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+    response = await context.request.get(url, headers=headers, timeout=options.timeout_ms)
+    try:
+        if response.status == 304:
+            return "not_modified", previous
+        if options.always_render or not response.ok:
+            return None, None
+        source_hash = hashlib.sha256(await response.body()).hexdigest()
+        if source_hash != previous.get("source_hash"):
+            return None, None
+        return "unchanged", {**previous, **_validators(response.headers), "source_hash": source_hash}
+    finally:
+        await response.dispose()
+
+
+def parse_html(html):
+    """Title and visible text of the rendered page."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    return title, soup.get_text(separator="\n", strip=True)
+
+
+async def export_page(context, url, previous, options):
+    """Returns (status, record or None, state entry); status: exported / unchanged / not_modified."""
+    incremental = previous and not options.full
+    if incremental:
+        status, entry = await check_unchanged(context, url, previous, options)
+        if status:
+            return status, None, entry
+
+    page = await context.new_page()
+    try:
+        response = await page.goto(url, wait_until="domcontentloaded", timeout=options.timeout_ms)
+        source = await response.body() if response is not None else b""
+        await wait_until_ready(page, options.ready_selector, options.settle_ms, options.timeout_ms)
         html = await page.content()
-
-        # Save raw HTML
-        with open("Insurance Product Configuration.html", "w", encoding="utf-8") as f:
+    finally:
+        await page.close()
+
+    # Parsing is CPU work: keep it off the loop driving the other contexts
+    title, text = await asyncio.to_thread(parse_html, html)
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    entry = {
+        "content_hash": content_hash,
+        "source_hash": hashlib.sha256(source).hexdigest(),
+        **_validators(response.headers if response is not None else {}),
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if incremental and previous.get("content_hash") == content_hash:
+        return "unchanged", None, entry
+
+    if options.html_dir:
+        os.makedirs(options.html_dir, exist_ok=True)
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+        with open(os.path.join(options.html_dir, name), "w", encoding="utf-8") as f:
             f.write(html)
-        print("✅ HTML saved to notion_page_raw.html")
-
-        # Close the browser
-        await browser.close()
-
-        # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(html, "lxml")
-
-        # Extract visible text
-        text = soup.get_text(separator="\n", strip=True)
 
-        with open("notion_clean.txt", "w", encoding="utf-8") as f:
-            f.write(text)
+    record = {"url": url, "title": title, "text": text, **entry}
+    return "exported", record, entry
+
+
+# ----------------------------------------------------------------------
+# 3. Crawler (bounded pool of browser contexts)
+# ----------------------------------------------------------------------
+async def export_pages(urls, options):
+    from playwright.async_api import async_playwright
+
+    state_path = options.state or f"{options.output}.state.json"
+    state = load_state(state_path)
+    cookies = auth_cookies(urls, os.getenv(TOKEN_ENV))
+    queue = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+    counts = {"exported": 0, "unchanged": 0, "not_modified": 0, "failed": 0}
+
+    with open(options.output, "a", encoding="utf-8") as out:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+
+            async def worker():
+                # One context per worker, reused for all of its pages
+                context = await browser.new_context(storage_state={"cookies": cookies})
+                try:
+                    while True:
+                        try:
+                            url = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        try:
+                            status, record, entry = await export_page(context, url, state.get(url), options)
+                        except Exception as e:
+                            counts["failed"] += 1
+                            print(f"⚠️ Failed to export {url}: {e}")
+                            continue
+
+                        if record is not None:
+                            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                            out.flush()
+                        state[url] = entry
+                        save_state(state_path, state)
+                        counts[status] += 1
+                        print(f"[INFO] {status}: {url}")
+                finally:
+                    await context.close()
+
+            try:
+                await asyncio.gather(*(worker() for _ in range(max(1, min(options.concurrency, len(urls))))))
+            finally:
+                await browser.close()
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Notion pages to JSONL (incremental)")
+    parser.add_argument("urls", nargs="*", help="Page URLs (default: the product configuration page)")
+    parser.add_argument("--pages", help="File with one page URL per line")
+    parser.add_argument("--output", default="notion_pages.jsonl")
+    parser.add_argument("--state", help="State file (default: <output>.state.json)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Browser contexts working in parallel")
+    parser.add_argument("--ready-selector", default=".notion-page-content",
+                        help="Element that marks the page content as loaded")
+    parser.add_argument("--settle-ms", type=int, default=750, help="Text must stop changing for this long")
+    parser.add_argument("--timeout-ms", type=int, default=120000)
+    parser.add_argument("--html-dir", help="Also save the rendered HTML of exported pages here")
+    parser.add_argument("--full", action="store_true", help="Export every page, ignoring the state file")
+    parser.add_argument("--always-render", action="store_true",
+                        help="Render pages whose served HTML is unchanged (app shells that load content later)")
+    options = parser.parse_args(argv)
+
+    urls = list(options.urls)
+    if options.pages:
+        urls += read_pages(options.pages)
+    urls = list(dict.fromkeys(urls or [DEFAULT_URL]))
+
+    if not os.getenv(TOKEN_ENV) and any("notion.so" in url for url in urls):
+        print(f"[WARN] {TOKEN_ENV} is not set; private Notion pages will not load")
+
+    counts = asyncio.run(export_pages(urls, options))
+    print(f"[INFO] Done: {counts}")
+    return 1 if counts["failed"] else 0
 
-        print("✅ Clean text saved to notion_clean.txt")
 
 if __name__ == "__main__":
-    asyncio.run(scrape_notion())
+    sys.exit(main())
 
 
 
@@ -0,0 +1,162 @@
+import io
+import cv2
+import numpy as np
+from PIL import Image
+
+import config
+
+# ----------------------------------------------------------------------
+# 1. Errors
+# ----------------------------------------------------------------------
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------
+# 2. Streaming Body Read (in memory, capped)
+# ----------------------------------------------------------------------
+async def read_body_limited(request, max_bytes=None):
+    """Read the raw request body chunk by chunk, failing as soon as it exceeds `max_bytes`."""
+    max_bytes = max_bytes or config.UPLOAD_MAX_BYTES
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+    return bytes(buffer)
+
+
+# ----------------------------------------------------------------------
+# 3. Header Check + Decode
+# ----------------------------------------------------------------------
+def check_image_header(data, max_pixels=None):
+    """Read only the image header and reject oversized / unreadable images before decoding."""
+    max_pixels = max_pixels or config.UPLOAD_MAX_PIXELS
+    if not data:
+        raise InvalidImageError("Empty upload")
+
+    try:
+        with Image.open(io.BytesIO(data)) as header:  # lazy: parses the header only
+            width, height = header.size
+    except Exception:
+        raise InvalidImageError("Unsupported or corrupt image")
+
+    if width * height > max_pixels:
+        raise UploadTooLargeError(
+            f"Image is {width}x{height} ({width * height} px), limit is {max_pixels} px"
+        )
+    return width, height
+
+
+def decode_image_bytes(data, max_pixels=None):
+    """Decode encoded image bytes straight into a BGR ndarray (no temp files)."""
+    check_image_header(data, max_pixels)
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        # Formats OpenCV cannot decode (GIF, ...) go through PIL
+        with Image.open(io.BytesIO(data)) as pil_image:
+            image = cv2.cvtColor(np.asarray(pil_image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    return image
+
+
+# ----------------------------------------------------------------------
+# 4. Two-resolution Decode (reduced for card detection, full for the crop)
+# ----------------------------------------------------------------------
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def reduction_factor(width, height, target=None):
+    """Largest decode scale (1, 2, 4 or 8) that keeps the long side at least `target` px."""
+    target = config.DETECT_MAX_SIDE if target is None else target
+    factor = 1
+    while target and factor < 8 and max(width, height) / (factor * 2) >= target:
+        factor *= 2
+    return factor
+
+
+def _decode(source, factor=1):
+    """Decode a path or encoded bytes at 1/`factor` scale (JPEG DCT scaling when possible)."""
+    flags = _REDUCED_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION
+    if isinstance(source, bytes):
+        image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flags)
+    else:
+        image = cv2.imread(source, flags)
+    if image is not None:
+        return image
+
+    # Formats OpenCV cannot decode (GIF, ...) go through PIL
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as pil_image:
+        image = cv2.cvtColor(np.asarray(pil_image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    if factor > 1:
+        height, width = image.shape[:2]
+        image = cv2.resize(image, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+    return image
+
+
+class CardImage:
+    """
+    An input photo for the card pipeline. `preview` is decoded at reduced
+    resolution (long side >= OCR_DETECT_MAX_SIDE) for card detection and the
+    cache key; the full-resolution pixels are only decoded for `crop`.
+    """
+
+    def __init__(self, source, max_pixels=None):
+        self._source = source
+
+        if isinstance(source, np.ndarray):
+            height, width = source.shape[:2]
+            factor = reduction_factor(width, height)
+            self.preview = source if factor == 1 else cv2.resize(
+                source, (width // factor, height // factor), interpolation=cv2.INTER_AREA
+            )
+        else:
+            if isinstance(source, (bytes, bytearray)):
+                source = self._source = bytes(source)
+                width, height = check_image_header(source, max_pixels)
+            else:
+                with Image.open(source) as header:  # header only
+                    width, height = header.size
+            factor = reduction_factor(width, height)
+            self.preview = _decode(source, factor)
+
+        self.factor = factor
+        self.size = (width, height)
+        preview_height, preview_width = self.preview.shape[:2]
+        self.scale = (width / preview_width, height / preview_height)
+
+    def full(self):
+        if isinstance(self._source, np.ndarray):
+            return self._source
+        if self.factor == 1:
+            return self.preview
+        return _decode(self._source)
+
+    def crop(self, box):
+        """Full-resolution crop of `box`, given in preview coordinates."""
+        scale_x, scale_y = self.scale
+        width, height = self.size
+        x1, y1, x2, y2 = box
+        # Round outwards so the card edge is never clipped
+        x1, x2 = max(0, int(x1 * scale_x)), min(width, int(np.ceil(x2 * scale_x)))
+        y1, y2 = max(0, int(y1 * scale_y)), min(height, int(np.ceil(y2 * scale_y)))
+
+        full = self.full()
+        cropped = full[y1:y2, x1:x2]
+        # Own copy when the full decode was made just for this crop, so it can be freed
+        return cropped if full is self._source or full is self.preview else cropped.copy()
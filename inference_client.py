@@ -0,0 +1,181 @@
+"""
+Client side of the shared inference server (see inference_server.py).
+
+With OCR_INFERENCE_SOCKET set, model_registry forwards predict / read_text /
+recognize_text here instead of loading the models in this process. Image
+pixels travel through shared memory; only small headers and the detected
+boxes go over the Unix socket. Connections are authenticated with
+OCR_INFERENCE_AUTHKEY, or with the key the server writes next to its socket
+(<socket>.key, readable by its user only).
+"""
+import threading
+import time
+from multiprocessing import AuthenticationError, shared_memory
+from multiprocessing.connection import Client
+
+import cv2
+import numpy as np
+
+import config
+
+# ----------------------------------------------------------------------
+# 1. Light-weight Results (only what the pipeline reads from ultralytics)
+# ----------------------------------------------------------------------
+class TensorLike(np.ndarray):
+    """ndarray that, like a 1-element torch tensor, converts with int() / float()."""
+
+    def __int__(self):
+        return int(self.reshape(-1)[0])
+
+    def __float__(self):
+        return float(self.reshape(-1)[0])
+
+
+def tensor(values):
+    """float32 TensorLike (also used by the benchmark stubs)."""
+    return np.array(values, dtype=np.float32).view(TensorLike)
+
+
+class LiteBox:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = tensor([xyxy])
+        self.cls = tensor([cls])
+        self.conf = tensor([conf])
+
+
+class LiteBoxes:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.asarray(cls, dtype=np.float32).reshape(-1)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+
+    def __iter__(self):
+        return (LiteBox(*row) for row in zip(self.xyxy, self.cls, self.conf))
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class LiteResult:
+    def __init__(self, xyxy, cls, conf, names):
+        self.boxes = LiteBoxes(xyxy, cls, conf)
+        self.names = names
+
+
+def _numpy(values):
+    return np.asarray(values.cpu() if hasattr(values, "cpu") else values, dtype=np.float32)
+
+
+def to_wire(result):
+    """ultralytics Results -> plain arrays (drops orig_img and the rest)."""
+    boxes = result.boxes
+    return _numpy(boxes.xyxy), _numpy(boxes.cls), _numpy(boxes.conf), dict(result.names)
+
+
+# ----------------------------------------------------------------------
+# 2. Shared-memory Image Transfer
+# ----------------------------------------------------------------------
+def share_image(image):
+    """Copy `image` into a new shared-memory block; returns (block, header)."""
+    image = np.ascontiguousarray(image)
+    block = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+    np.ndarray(image.shape, dtype=image.dtype, buffer=block.buf)[...] = image
+    return block, (block.name, image.shape, image.dtype.str)
+
+
+def _release(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# ----------------------------------------------------------------------
+# 3. Connection (one per thread; the server batches across them)
+# ----------------------------------------------------------------------
+class RemoteError(RuntimeError):
+    pass
+
+
+_local = threading.local()
+
+
+def authkey_path(address):
+    return f"{address}.key"
+
+
+def load_authkey(address):
+    if config.INFERENCE_AUTHKEY:
+        return config.INFERENCE_AUTHKEY.encode("utf-8")
+    try:
+        with open(authkey_path(address), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        raise RemoteError(f"⚠️ No OCR_INFERENCE_AUTHKEY and no key file at {authkey_path(address)}; "
+                          f"is the inference server running?") from None
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        address = config.INFERENCE_SOCKET
+        conn = Client(address, family="AF_UNIX", authkey=load_authkey(address))
+        _local.conn = conn
+    return conn
+
+
+def _call(op, name=None, images=(), kwargs=None):
+    blocks, headers = [], []
+    try:
+        for image in images:
+            if isinstance(image, str):
+                image = cv2.imread(image)
+            block, header = share_image(image)
+            blocks.append(block)
+            headers.append(header)
+
+        conn = _connection()
+        try:
+            conn.send((op, name, headers, kwargs or {}))
+            if not conn.poll(config.INFERENCE_TIMEOUT):
+                raise RemoteError(f"⚠️ Inference server did not answer within {config.INFERENCE_TIMEOUT}s")
+            status, payload = conn.recv()
+        except (OSError, EOFError, RemoteError):
+            _local.conn = None  # reconnect on the next call
+            conn.close()
+            raise
+    finally:
+        _release(blocks)
+
+    if status != "ok":
+        raise RemoteError(f"⚠️ Inference server error: {payload}")
+    return payload
+
+
+# ----------------------------------------------------------------------
+# 4. Registry-compatible Entry Points
+# ----------------------------------------------------------------------
+def predict(name, source, **kwargs):
+    images = source if isinstance(source, list) else [source]
+    return [LiteResult(*wire) for wire in _call("predict", name, images, kwargs)]
+
+
+def read_text(image, **kwargs):
+    return _call("read_text", images=[image], kwargs=kwargs)
+
+
+def recognize_text(image, **kwargs):
+    return _call("recognize_text", images=[image], kwargs=kwargs)
+
+
+def wait_until_ready(timeout=None):
+    """Block until the server answers a ping with its models warmed; returns True / False."""
+    deadline = time.monotonic() + (config.INFERENCE_TIMEOUT if timeout is None else timeout)
+    while True:
+        try:
+            if _call("ping"):
+                return True
+        except (OSError, EOFError, RemoteError, AuthenticationError):
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.5)
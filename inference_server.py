@@ -0,0 +1,228 @@
+"""
+Shared inference server: one copy of the YOLO models and the EasyOCR reader
+per node, used by every API worker.
+
+    python inference_server.py --socket /tmp/ocr-inference.sock
+    OCR_INFERENCE_SOCKET=/tmp/ocr-inference.sock uvicorn app:app --workers 4
+
+YOLO requests from all workers are collected for up to OCR_INFERENCE_MAX_WAIT_MS
+(or until OCR_INFERENCE_MAX_BATCH images) and run as one batched forward pass.
+EasyOCR calls are served one at a time. Images arrive through shared memory.
+
+The socket is created owner-only (0600), and clients must present the
+OCR_INFERENCE_AUTHKEY (or, when it is unset, the random key written to
+<socket>.key, also 0600) before the server unpickles anything they send.
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError, resource_tracker, shared_memory
+from multiprocessing.connection import Listener
+
+import numpy as np
+
+import config
+
+DEFAULT_SOCKET = config.INFERENCE_SOCKET or "/tmp/ocr-inference.sock"
+# Never forward to ourselves
+config.INFERENCE_SOCKET = ""
+
+import model_registry  # noqa: E402
+from inference_client import authkey_path, to_wire  # noqa: E402
+from metrics import STAGE_SECONDS  # noqa: E402
+
+# ----------------------------------------------------------------------
+# 1. Shared-memory Images
+# ----------------------------------------------------------------------
+def attach(header):
+    """Map a client's shared-memory image without copying; returns (block, ndarray)."""
+    name, shape, dtype = header
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        # The client owns (and unlinks) the block
+        resource_tracker.unregister(block._name, "shared_memory")
+    except Exception:
+        pass
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+# ----------------------------------------------------------------------
+# 2. Micro-batcher (one per YOLO model)
+# ----------------------------------------------------------------------
+class _Pending:
+    def __init__(self, images, kwargs):
+        self.images = images
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Collects requests for one model and runs them as batched forward passes."""
+
+    def __init__(self, name, max_batch=None, max_wait_ms=None):
+        self.name = name
+        self.max_batch = max_batch or config.INFERENCE_MAX_BATCH
+        self.max_wait = (config.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, images, kwargs):
+        pending = _Pending(images, kwargs)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0].images)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.images)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Only requests with the same predict kwargs (imgsz, conf, ...) share a pass
+            groups = {}
+            for pending in batch:
+                groups.setdefault(tuple(sorted(pending.kwargs.items())), []).append(pending)
+
+            for key, group in groups.items():
+                images = [image for pending in group for image in pending.images]
+                start = time.perf_counter()
+                try:
+                    results = model_registry.predict(self.name, images, **dict(key))
+                    wire = [to_wire(result) for result in results]
+                except Exception as e:
+                    images = results = None
+                    for pending in group:
+                        pending.error = e
+                        pending.images = None
+                        pending.done.set()
+                    continue
+                STAGE_SECONDS.labels(f"inference_batch_{len(images)}").observe(time.perf_counter() - start)
+                del images, results  # release the shared-memory views before the clients unmap them
+
+                offset = 0
+                for pending in group:
+                    count = len(pending.images)
+                    pending.result = wire[offset:offset + count]
+                    pending.images = None
+                    offset += count
+                    pending.done.set()
+
+
+# ----------------------------------------------------------------------
+# 3. Server
+# ----------------------------------------------------------------------
+class InferenceServer:
+    def __init__(self, address=None):
+        self.address = address or DEFAULT_SOCKET
+        self.batchers = {name: MicroBatcher(name) for name in model_registry.YOLO_MODELS}
+
+    def handle(self, op, name, images, kwargs):
+        if op == "ping":
+            return model_registry.is_warmed_up() or not config.PRELOAD_MODELS
+        if op == "predict":
+            return self.batchers[name].submit(images, kwargs)
+        if op == "read_text":
+            return model_registry.read_text(images[0], **kwargs)
+        if op == "recognize_text":
+            return model_registry.recognize_text(images[0], **kwargs)
+        raise ValueError(f"Unknown operation: {op}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, name, headers, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                blocks, images = [], []
+                try:
+                    for header in headers:
+                        block, image = attach(header)
+                        blocks.append(block)
+                        images.append(image)
+                    reply = ("ok", self.handle(op, name, images, kwargs))
+                except Exception as e:
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                finally:
+                    del images  # drop the views before closing the mappings
+                    for block in blocks:
+                        try:
+                            block.close()
+                        except BufferError:
+                            pass  # a view is still referenced; the mapping goes with it
+
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def _authkey(self):
+        if config.INFERENCE_AUTHKEY:
+            return config.INFERENCE_AUTHKEY.encode("utf-8")
+        # A fresh key per run, readable only by the user the workers run as
+        key = os.urandom(32)
+        path = authkey_path(self.address)
+        if os.path.exists(path):
+            os.unlink(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        return key
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        authkey = self._authkey()
+
+        # Bind with a umask so the socket is 0600 from the start (no chmod race)
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(umask)
+
+        with listener:
+            print(f"[INFO] Inference server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:
+                    print(f"[WARN] Rejected inference client: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared YOLO / EasyOCR inference server")
+    parser.add_argument("--socket", default=None, help="Unix socket path (default: OCR_INFERENCE_SOCKET)")
+    args = parser.parse_args(argv)
+
+    model_registry.init_models()
+    InferenceServer(args.socket).serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
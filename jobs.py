@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+
+import config
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def validate_callback_url(url):
+    """Only plain http(s) callbacks; anything else (file:, ftp:, ...) is rejected."""
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        raise ValueError(f"callback_url must be an http(s) URL, got {url!r}")
+    return url
+
+# ----------------------------------------------------------------------
+# 1. Durable Job Queue (SQLite)
+# ----------------------------------------------------------------------
+class JobQueue:
+    """
+    Several API processes may share one database: claims are a conditional
+    UPDATE, and each running row records its owner and a heartbeat so only
+    jobs of a dead process are put back in the queue.
+    """
+
+    def __init__(self, db_path=None, owner=None):
+        db_path = db_path or config.JOBS_DB_PATH
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " image_path TEXT NOT NULL,"
+                " application_number TEXT NOT NULL,"
+                " callback_url TEXT,"
+                " status TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL,"
+                " started REAL,"
+                " finished REAL,"
+                " owner TEXT,"
+                " heartbeat REAL)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:  # databases created before owners were recorded
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def submit(self, image_path, application_number, callback_url=None):
+        if callback_url:
+            validate_callback_url(callback_url)
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, image_path, application_number, callback_url, status, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, image_path, application_number, callback_url, QUEUED, time.time())
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim_next(self):
+        """Atomically move the oldest queued job to running and return it (or None)."""
+        with self._lock:
+            while True:
+                with self._conn:
+                    row = self._conn.execute(
+                        "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    now = time.time()
+                    # Only one process wins the row; a loser sees rowcount 0 and tries the next
+                    claimed = self._conn.execute(
+                        "UPDATE jobs SET status = ?, started = ?, owner = ?, heartbeat = ?,"
+                        " attempts = attempts + 1 WHERE id = ? AND status = ?",
+                        (RUNNING, now, self.owner, now, row["id"], QUEUED)
+                    ).rowcount
+                if claimed:
+                    row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                    return _row_to_job(row)
+
+    def complete(self, job_id, result):
+        self._finish(job_id, DONE, result=json.dumps(result, ensure_ascii=False))
+
+    def fail(self, job_id, error):
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        # Ignored when the job was meanwhile recovered and claimed by someone else
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, owner = NULL"
+                " WHERE id = ? AND status = ? AND owner = ?",
+                (status, result, error, time.time(), job_id, RUNNING, self.owner)
+            )
+
+    def requeue(self, job_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started = NULL, owner = NULL, heartbeat = NULL,"
+                " attempts = attempts - 1 WHERE id = ? AND status = ? AND owner = ?",
+                (QUEUED, job_id, RUNNING, self.owner)
+            )
+
+    def heartbeat(self):
+        """Mark this process's running jobs as alive."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE status = ? AND owner = ?",
+                (time.time(), RUNNING, self.owner)
+            )
+
+    def recover(self, stale_after=None):
+        """Put jobs whose owner stopped sending heartbeats (crashed / restarted) back in the queue."""
+        stale_after = config.JOBS_STALE_AFTER if stale_after is None else stale_after
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started = NULL, owner = NULL, heartbeat = NULL"
+                " WHERE status = ? AND (heartbeat IS NULL OR heartbeat < ?)",
+                (QUEUED, RUNNING, time.time() - stale_after)
+            ).rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+# ----------------------------------------------------------------------
+# 2. Callbacks
+# ----------------------------------------------------------------------
+def notify_callback(url, payload):
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    request = urllib.request.Request(
+        url, data=data, method="POST", headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=config.JOBS_CALLBACK_TIMEOUT):
+            pass
+    except Exception as e:
+        print(f"[WARN] Callback to {url} failed: {e}")
+
+
+def public_view(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "application_number": job["application_number"],
+        "result": job["result"],
+        "error": job["error"],
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+    }
+
+
+# ----------------------------------------------------------------------
+# 3. Background Runner
+# ----------------------------------------------------------------------
+class JobRunner:
+    """
+    Pulls jobs from the queue with `workers` asyncio tasks. `process(job)` is a
+    coroutine returning the response JSON; `busy_errors` are exceptions that mean
+    "try again later" (the job goes back in the queue instead of failing).
+    """
+
+    def __init__(self, job_queue, process, workers=None, busy_errors=()):
+        self.queue = job_queue
+        self.process = process
+        self.workers = workers or config.JOBS_WORKERS
+        self.busy_errors = busy_errors
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._stopping = False
+
+    def start(self):
+        self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    def _recover(self):
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"[INFO] Re-queued {recovered} interrupted job(s)")
+            self.notify()
+
+    async def _heartbeat(self):
+        # Keep our running jobs fresh and pick up the ones of a sibling that died
+        while not self._stopping:
+            await asyncio.sleep(config.JOBS_STALE_AFTER / 4)
+            await asyncio.to_thread(self.queue.heartbeat)
+            await asyncio.to_thread(self._recover)
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def _worker(self):
+        while not self._stopping:
+            job = await asyncio.to_thread(self.queue.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), config.JOBS_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = await self.process(job)
+            except self.busy_errors as e:
+                await asyncio.to_thread(self.queue.requeue, job["id"])
+                await asyncio.sleep(getattr(e, "retry_after", config.JOBS_POLL_INTERVAL))
+                continue
+            except asyncio.CancelledError:
+                await asyncio.to_thread(self.queue.requeue, job["id"])
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.queue.fail, job["id"], str(e))
+            else:
+                await asyncio.to_thread(self.queue.complete, job["id"], result)
+
+            if job["callback_url"]:
+                finished = await asyncio.to_thread(self.queue.get, job["id"])
+                await asyncio.to_thread(notify_callback, job["callback_url"], public_view(finished))
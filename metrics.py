@@ -0,0 +1,122 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+except ImportError:  # metrics become no-ops, /metrics reports it is unavailable
+    Counter = Gauge = Histogram = None
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+    generate_latest = None
+
+# ----------------------------------------------------------------------
+# 1. Metric Definitions
+# ----------------------------------------------------------------------
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+def _metric(kind, name, documentation, labels=(), **kwargs):
+    if kind is None:
+        return _NoopMetric()
+    return kind(name, documentation, labels, **kwargs)
+
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = _metric(
+    Histogram, "ocr_stage_seconds", "Time spent in each OCR pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = _metric(
+    Histogram, "ocr_request_seconds", "HTTP request latency", ["route"], buckets=STAGE_BUCKETS
+)
+REQUESTS = _metric(Counter, "ocr_requests_total", "HTTP requests", ["route", "status"])
+DETECTION_FAILURES = _metric(
+    Counter, "ocr_detection_failures_total", "Card / field detections that found nothing", ["target"]
+)
+REGEX_MISSES = _metric(
+    Counter, "ocr_regex_misses_total", "OCR output that did not match the expected pattern", ["field"]
+)
+FACTORY_VARIANTS = _metric(
+    Counter, "ocr_factory_variant_success_total", "Factory-number variant that produced the match", ["variant"]
+)
+POOL_GAUGE = _metric(Gauge, "ocr_pool", "OCR worker pool state", ["metric"])
+CACHE_GAUGE = _metric(Gauge, "ocr_cache", "Result cache counters", ["metric"])
+JOBS_GAUGE = _metric(Gauge, "ocr_jobs", "Asynchronous jobs by status", ["status"])
+NID_ATTEMPTS = _metric(
+    Counter, "ocr_nid_attempts_total", "National ID cascade attempts by outcome", ["attempt", "outcome"]
+)
+
+
+def available():
+    return generate_latest is not None
+
+
+# ----------------------------------------------------------------------
+# 2. Stage Timing + Optional Per-request Trace
+# ----------------------------------------------------------------------
+_trace = contextvars.ContextVar("ocr_trace", default=None)
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append({"stage": name, "ms": round(elapsed * 1000, 2)})
+
+
+def traced(fn, *args, **kwargs):
+    """Run `fn` collecting a stage trace; returns (result, trace). Module level so it pickles."""
+    trace = []
+    token = _trace.set(trace)
+    try:
+        return fn(*args, **kwargs), trace
+    finally:
+        _trace.reset(token)
+
+
+def count_detection_failure(target):
+    DETECTION_FAILURES.labels(target).inc()
+
+
+def count_regex_miss(field):
+    REGEX_MISSES.labels(field).inc()
+
+
+def count_factory_variant(variant):
+    FACTORY_VARIANTS.labels(str(variant)).inc()
+
+
+def count_nid_attempt(attempt, outcome):
+    NID_ATTEMPTS.labels(attempt, outcome).inc()
+
+
+# ----------------------------------------------------------------------
+# 3. Exposition
+# ----------------------------------------------------------------------
+def set_gauges(gauge, values, prefix=""):
+    for key, value in values.items():
+        if isinstance(value, dict):
+            set_gauges(gauge, value, f"{prefix}{key}_")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            gauge.labels(f"{prefix}{key}").set(value)
+
+
+def render():
+    return generate_latest() if available() else b"# prometheus_client is not installed\n"
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+import numpy as np
+
+import config
+
+# ----------------------------------------------------------------------
+# 1. Model Names
+# ----------------------------------------------------------------------
+ID_CARD_MODEL = "detect_id_card.pt"
+FIELDS_MODEL = "detect_odjects.pt"
+DIGITS_MODEL = "detect_id.pt"
+EASYOCR_READER = "easyocr"
+
+YOLO_MODELS = (ID_CARD_MODEL, FIELDS_MODEL, DIGITS_MODEL)
+ALL_MODELS = YOLO_MODELS + (EASYOCR_READER,)
+
+# ----------------------------------------------------------------------
+# 2. Loaders
+# ----------------------------------------------------------------------
+def exported_path(name, backend=None, int8=None):
+    """Where `detector_export` writes (and the loader looks for) a detector for `backend`."""
+    backend = backend or config.DETECTOR_BACKEND
+    int8 = config.DETECTOR_INT8 if int8 is None else int8
+    stem = os.path.splitext(name)[0] + ("_int8" if int8 else "")
+
+    if backend == "onnx":
+        return os.path.join(config.MODEL_DIR, f"{stem}.onnx")
+    if backend == "openvino":
+        return os.path.join(config.MODEL_DIR, f"{stem}_openvino_model")
+    if backend == "torch":
+        return os.path.join(config.MODEL_DIR, name)
+    raise ValueError(f"Unknown detector backend: {backend}")
+
+
+def _load_yolo(name):
+    # ultralytics runs .onnx files / OpenVINO directories through the same
+    # Results API, so every call site stays unchanged
+    from ultralytics import YOLO
+    path = exported_path(name)
+    if not os.path.exists(path):
+        print(f"[WARN] {path} not found, using the PyTorch model (run detector_export.py)")
+        path = os.path.join(config.MODEL_DIR, name)
+    return YOLO(path, task="detect")
+
+
+def _load_easyocr(_name):
+    import easyocr
+    return easyocr.Reader(config.EASYOCR_LANGS, gpu=config.EASYOCR_GPU)
+
+
+_factories = {
+    ID_CARD_MODEL: _load_yolo,
+    FIELDS_MODEL: _load_yolo,
+    DIGITS_MODEL: _load_yolo,
+    EASYOCR_READER: _load_easyocr,
+}
+
+# ----------------------------------------------------------------------
+# 3. Process-wide Registry
+# ----------------------------------------------------------------------
+_models = {}
+_locks = {name: threading.Lock() for name in _factories}
+_registry_lock = threading.Lock()
+_warmed_up = False
+
+
+def register_model(name, factory):
+    """Register (or replace) the loader used for `name` and drop any cached instance."""
+    with _registry_lock:
+        _factories[name] = factory
+        _locks.setdefault(name, threading.Lock())
+        _models.pop(name, None)
+
+
+def get_model(name):
+    """Return the shared instance for `name`, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model = _models.get(name)
+        if model is None:
+            if name not in _factories:
+                raise KeyError(f"Unknown model: {name}")
+            start = time.perf_counter()
+            model = _factories[name](name)
+            _models[name] = model
+            print(f"[INFO] Loaded {name} in {time.perf_counter() - start:.2f}s")
+    return model
+
+
+def get_reader():
+    return get_model(EASYOCR_READER)
+
+
+def model_lock(name):
+    """Lock serialising inference on a shared model instance."""
+    return _locks[name]
+
+
+def _remote():
+    if not config.INFERENCE_SOCKET:
+        return None
+    import inference_client
+    return inference_client
+
+
+def predict(name, source, **kwargs):
+    """Run a YOLO model from the registry on `source` (path, ndarray or list of them)."""
+    remote = _remote()
+    if remote is not None:
+        return remote.predict(name, source, **kwargs)
+    model = get_model(name)
+    with model_lock(name):
+        return model(source, verbose=False, **kwargs)
+
+
+def read_text(image, **kwargs):
+    """Run the shared EasyOCR reader on `image`."""
+    remote = _remote()
+    if remote is not None:
+        return remote.read_text(image, **kwargs)
+    reader = get_reader()
+    with model_lock(EASYOCR_READER):
+        return reader.readtext(image, **kwargs)
+
+
+def recognize_text(image, **kwargs):
+    """Recognition-only EasyOCR pass over boxes that are already localised."""
+    remote = _remote()
+    if remote is not None:
+        return remote.recognize_text(image, **kwargs)
+    reader = get_reader()
+    with model_lock(EASYOCR_READER):
+        return reader.recognize(image, **kwargs)
+
+
+def loaded_models():
+    return sorted(_models)
+
+
+# ----------------------------------------------------------------------
+# 4. Preload + Warm-up
+# ----------------------------------------------------------------------
+def preload_models(names=ALL_MODELS):
+    for name in names:
+        get_model(name)
+
+
+def warmup_models(names=ALL_MODELS):
+    """Run one dummy inference per model so the first request does not pay for graph setup."""
+    global _warmed_up
+    dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+
+    for name in names:
+        start = time.perf_counter()
+        if name == EASYOCR_READER:
+            read_text(np.zeros((32, 128, 3), dtype=np.uint8), detail=0)
+        else:
+            predict(name, dummy)
+        print(f"[INFO] Warmed up {name} in {time.perf_counter() - start:.2f}s")
+
+    _warmed_up = True
+
+
+def init_models():
+    """Called once per worker at startup; honours OCR_PRELOAD_MODELS / OCR_WARMUP_MODELS."""
+    global _warmed_up
+    remote = _remote()
+    if remote is not None:
+        # Models live in the shared inference server; just wait for it
+        _warmed_up = remote.wait_until_ready()
+        if not _warmed_up:
+            raise RuntimeError(f"⚠️ Inference server at {config.INFERENCE_SOCKET} is not answering")
+        print(f"[INFO] Using the shared inference server at {config.INFERENCE_SOCKET}")
+        return
+
+    if not config.PRELOAD_MODELS:
+        print("[INFO] Lazy model loading enabled; models load on first request")
+        return
+
+    preload_models()
+    if config.WARMUP_MODELS:
+        warmup_models()
+
+
+def is_warmed_up():
+    return _warmed_up
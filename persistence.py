@@ -0,0 +1,101 @@
+import json
+import os
+import queue
+import random
+import threading
+
+import cv2
+import numpy as np
+
+import config
+from metrics import stage, _metric, Counter
+
+POLICIES = ("off", "sampled", "on_error", "always")
+
+ARTIFACTS_WRITTEN = _metric(Counter, "ocr_artifacts_written_total", "Artifacts written by the background writer", ["kind"])
+ARTIFACTS_DROPPED = _metric(Counter, "ocr_artifacts_dropped_total", "Artifacts dropped because the writer queue was full")
+
+# ----------------------------------------------------------------------
+# 1. Policy
+# ----------------------------------------------------------------------
+def should_persist(persist=None, error=False):
+    """
+    persist=True / False forces the decision; None applies OCR_PERSIST_POLICY:
+    off, sampled (OCR_PERSIST_SAMPLE_PERCENT of requests), on_error or always.
+    """
+    if persist is not None:
+        return persist
+
+    policy = config.PERSIST_POLICY
+    if policy == "always":
+        return True
+    if policy == "on_error":
+        return error
+    if policy == "sampled":
+        return random.random() * 100 < config.PERSIST_SAMPLE_PERCENT
+    return False
+
+
+# ----------------------------------------------------------------------
+# 2. Background Writer (bounded queue, never blocks the request path)
+# ----------------------------------------------------------------------
+class ArtifactWriter:
+    def __init__(self, max_queue=None):
+        self._queue = queue.Queue(maxsize=max_queue or config.PERSIST_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, kind, path, payload):
+        """Queue a write; returns False (and counts a drop) when the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((kind, path, payload))
+            return True
+        except queue.Full:
+            ARTIFACTS_DROPPED.inc()
+            return False
+
+    def submit_image(self, path, image):
+        return self.submit("image", path, image)
+
+    def submit_json(self, path, data):
+        return self.submit("json", path, data)
+
+    def _run(self):
+        while True:
+            kind, path, payload = self._queue.get()
+            try:
+                with stage("artifact_write"):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if kind == "image":
+                        cv2.imwrite(path, payload)
+                    else:
+                        with open(path, "w", encoding="utf-8") as f:
+                            json.dump(payload, f, indent=4, ensure_ascii=False)
+                ARTIFACTS_WRITTEN.labels(kind).inc()
+            except Exception as e:
+                print(f"[WARN] Could not write {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued artifact is written (tests / batch CLI shutdown)."""
+        self._queue.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+
+writer = ArtifactWriter()
+
+
+def snapshot(image):
+    """Own copy of a (view of a) crop, so the writer never sees later mutations."""
+    return np.ascontiguousarray(image).copy()
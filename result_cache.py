@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import config
+
+# ----------------------------------------------------------------------
+# 1. Image Keys
+# ----------------------------------------------------------------------
+def content_hash(image):
+    """Hash of the decoded pixels, so the same image under any file name shares a key."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def perceptual_hash(image):
+    """64-bit difference hash (dHash); survives re-encoding and mild resizing."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+# The on-disk tier finds near matches through four 16-bit bands of the hash:
+# two hashes within 3 bits of each other agree exactly on at least one band
+PHASH_BANDS = 4
+MAX_DISK_PHASH_DISTANCE = PHASH_BANDS - 1
+
+
+def _bands(phash):
+    return [(phash >> (16 * i)) & 0xFFFF for i in range(PHASH_BANDS)]
+
+
+# ----------------------------------------------------------------------
+# 2. On-disk Tier (SQLite, survives restarts)
+# ----------------------------------------------------------------------
+class _SQLiteTier:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, phash TEXT, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_phash ON results (phash)")
+            self._add_bands()
+
+    def _add_bands(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        for i in range(PHASH_BANDS):
+            if f"band{i}" not in columns:
+                self._conn.execute(f"ALTER TABLE results ADD COLUMN band{i} INTEGER")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS results_band{i} ON results (band{i})")
+        # Rows written before the bands existed
+        rows = self._conn.execute(
+            "SELECT key, phash FROM results WHERE phash IS NOT NULL AND band0 IS NULL"
+        ).fetchall()
+        self._conn.executemany(
+            "UPDATE results SET band0 = ?, band1 = ?, band2 = ?, band3 = ? WHERE key = ?",
+            [(*_bands(int(phash, 16)), key) for key, phash in rows]
+        )
+
+    def get(self, key, ttl):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        return self._check(key, row, ttl)
+
+    def get_by_phash(self, phash, distance, ttl):
+        """Newest entry within `distance` bits (<= MAX_DISK_PHASH_DISTANCE) of `phash`."""
+        where = " OR ".join(f"band{i} = ?" for i in range(PHASH_BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT value, created, phash FROM results WHERE {where} ORDER BY created DESC",
+                _bands(phash)
+            ).fetchall()
+        for value, created, other in rows:
+            if ttl and time.time() - created > ttl:
+                continue
+            if _hamming(phash, int(other, 16)) <= distance:
+                return tuple(json.loads(value))
+        return None
+
+    def _check(self, key, row, ttl):
+        if row is None:
+            return None
+        value, created = row
+        if ttl and time.time() - created > ttl:
+            self.delete(key)
+            return None
+        return tuple(json.loads(value))
+
+    def put(self, key, phash, value, max_entries):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, phash, value, created, band0, band1, band2, band3)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, format(phash, "016x") if phash is not None else None,
+                 json.dumps(list(value), ensure_ascii=False), time.time(),
+                 *(_bands(phash) if phash is not None else [None] * PHASH_BANDS))
+            )
+            if max_entries:
+                self._conn.execute(
+                    "DELETE FROM results WHERE key NOT IN "
+                    "(SELECT key FROM results ORDER BY created DESC LIMIT ?)",
+                    (max_entries,)
+                )
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+
+# ----------------------------------------------------------------------
+# 3. Result Cache (in-memory LRU + optional SQLite)
+# ----------------------------------------------------------------------
+class ResultCache:
+    def __init__(self, max_entries=None, ttl=None, db_path=None,
+                 use_phash=None, phash_distance=None, disk_max_entries=None):
+        self.max_entries = config.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = config.CACHE_TTL if ttl is None else ttl
+        self.use_phash = config.CACHE_PHASH if use_phash is None else use_phash
+        self.phash_distance = config.CACHE_PHASH_DISTANCE if phash_distance is None else phash_distance
+        self.disk_max_entries = config.CACHE_DISK_MAX_ENTRIES if disk_max_entries is None else disk_max_entries
+        db_path = config.CACHE_DB_PATH if db_path is None else db_path
+        if db_path and self.use_phash and self.phash_distance > MAX_DISK_PHASH_DISTANCE:
+            raise ValueError(
+                f"⚠️ OCR_CACHE_PHASH_DISTANCE={self.phash_distance} is not supported with the SQLite tier "
+                f"(max {MAX_DISK_PHASH_DISTANCE}); lower it or unset OCR_CACHE_DB_PATH"
+            )
+
+        self._memory = OrderedDict()  # key -> (value, phash, created)
+        self._lock = threading.Lock()
+        self._disk = _SQLiteTier(db_path) if db_path else None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "phash_hits": 0, "misses": 0, "stores": 0}
+
+    def keys_for(self, image):
+        phash = perceptual_hash(image) if self.use_phash else None
+        return content_hash(image), phash
+
+    def _expired(self, created):
+        return self.ttl and time.time() - created > self.ttl
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key, phash=None):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry[2]):
+                    del self._memory[key]
+                else:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[0]
+
+        if self._disk is not None:
+            value = self._disk.get(key, self.ttl)
+            if value is not None:
+                self._count("disk_hits")
+                self._remember(key, phash, value)
+                return value
+
+        if phash is not None:
+            value = self._get_similar(phash)
+            if value is not None:
+                self._count("phash_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def _get_similar(self, phash):
+        with self._lock:
+            for value, other, created in reversed(self._memory.values()):
+                if other is not None and not self._expired(created) \
+                        and _hamming(phash, other) <= self.phash_distance:
+                    return value
+
+        if self._disk is not None:
+            return self._disk.get_by_phash(phash, self.phash_distance, self.ttl)
+        return None
+
+    def _remember(self, key, phash, value):
+        with self._lock:
+            self._memory[key] = (value, phash, time.time())
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def put(self, key, phash, value):
+        value = tuple(value)
+        self._remember(key, phash, value)
+        if self._disk is not None:
+            self._disk.put(key, phash, value, self.disk_max_entries)
+        self._count("stores")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._memory)
+        hits = counters["memory_hits"] + counters["disk_hits"] + counters["phash_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disk_tier": self._disk is not None,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, or None when OCR_CACHE_ENABLED is off."""
+    global _cache
+    if not config.CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
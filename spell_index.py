@@ -0,0 +1,340 @@
+"""
+Arabic name / place correction with a symmetric-delete (SymSpell-style) index.
+
+    python spell_index.py                          # build the index from OCR_SPELL_LEXICON
+    python spell_index.py --lookup محمود أحمط
+
+Every lexicon word is stored under the hashes of its deletes (up to
+OCR_SPELL_MAX_DISTANCE characters removed from the first
+OCR_SPELL_PREFIX_LENGTH). A lookup generates the deletes of the input word and
+binary-searches them, so only a handful of candidates are compared by edit
+distance. The index is one flat file, memory-mapped read-only, so all workers
+on a node share the same pages.
+
+File layout (little endian, arrays 8-byte aligned):
+    magic | header (uint64 x 6) | key offsets | word offsets | counts
+          | key bytes | word bytes | delete hashes (sorted) | word ids
+"""
+import argparse
+import mmap
+import os
+import re
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+import config
+
+MAGIC = b"SYMSPEL1"
+_HEADER = np.dtype("<u8")
+_HEADER_FIELDS = 6  # max_distance, prefix_length, words, key bytes, word bytes, entries
+
+# Tashkeel, superscript alef and tatweel are dropped; alef / yeh / teh
+# marbuta variants that Tesseract mixes up compare as equal
+_IGNORED = re.compile("[\u064B-\u0652\u0670\u0640]")
+_LETTERS = str.maketrans({"\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627",
+                          "\u0649": "\u064A", "\u0629": "\u0647"})  # أإآٱ -> ا, ى -> ي, ة -> ه
+_ARABIC_WORD = re.compile("[\u0621-\u064A\u064B-\u0652\u0670\u0671]+")
+# "الشارع" / "والشارع" are the known word "شارع" with an article / conjunction attached
+_PREFIXES = ("وال", "ال", "و")
+
+
+def normalize(word):
+    return _IGNORED.sub("", word).translate(_LETTERS)
+
+
+def _hash(text):
+    # Stable across processes (unlike hash()); collisions only add candidates
+    data = text.encode("utf-8")
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+
+def _deletes(key, max_distance, prefix_length):
+    key = key[:prefix_length]
+    deletes = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        deletes |= frontier
+    return deletes
+
+
+def distance_for(key, max_distance):
+    """Short words get fewer edits: "علا" is one edit from "علي" but is a name of its own."""
+    if len(key) <= 3:
+        return 0
+    if len(key) <= 5:
+        return min(1, max_distance)
+    return max_distance
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance; any value > max_distance means "too far"."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+# ----------------------------------------------------------------------
+# 1. Build (offline, once per lexicon change)
+# ----------------------------------------------------------------------
+def read_lexicon(path):
+    """{word: count} from "word [count]" lines; multi-word entries count for each word."""
+    counts = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            count = 1
+            if len(parts) > 1 and parts[-1].isdigit():
+                count = int(parts.pop())
+            for word in parts:
+                counts[word] = counts.get(word, 0) + count
+    return counts
+
+
+def _offsets(blobs):
+    offsets = np.zeros(len(blobs) + 1, dtype="<u4")
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+    return offsets
+
+
+def build_index(lexicon_path, index_path, max_distance=None, prefix_length=None):
+    max_distance = config.SPELL_MAX_DISTANCE if max_distance is None else max_distance
+    prefix_length = prefix_length or config.SPELL_PREFIX_LENGTH
+
+    # One entry per normalised key; the most frequent spelling is what lookups return
+    best = {}
+    for word, count in read_lexicon(lexicon_path).items():
+        key = normalize(word)
+        if not key:
+            continue
+        total, spelling, spelling_count = best.get(key, (0, word, 0))
+        if count > spelling_count:
+            spelling, spelling_count = word, count
+        best[key] = (total + count, spelling, spelling_count)
+
+    keys = sorted(best)
+    key_blobs = [key.encode("utf-8") for key in keys]
+    word_blobs = [best[key][1].encode("utf-8") for key in keys]
+    counts = np.array([best[key][0] for key in keys], dtype="<u4")
+
+    hashes, word_ids = [], []
+    for word_id, key in enumerate(keys):
+        for delete in _deletes(key, max_distance, prefix_length):
+            hashes.append(_hash(delete))
+            word_ids.append(word_id)
+    hashes = np.array(hashes, dtype="<u8")
+    word_ids = np.array(word_ids, dtype="<u4")
+    order = np.lexsort((word_ids, hashes))
+    hashes, word_ids = hashes[order], word_ids[order]
+
+    header = np.array([max_distance, prefix_length, len(keys), sum(map(len, key_blobs)),
+                       sum(map(len, word_blobs)), len(hashes)], dtype=_HEADER)
+    arrays = [
+        header, _offsets(key_blobs), _offsets(word_blobs), counts,
+        np.frombuffer(b"".join(key_blobs), dtype=np.uint8),
+        np.frombuffer(b"".join(word_blobs), dtype=np.uint8),
+        hashes, word_ids,
+    ]
+
+    # Written next to the target and renamed, so a worker never maps a partial file
+    directory = os.path.dirname(os.path.abspath(index_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        for array in arrays:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(array.tobytes())
+    os.replace(tmp_path, index_path)
+
+    print(f"[INFO] Spell index: {len(keys)} words, {len(hashes)} deletes -> {index_path}")
+    return index_path
+
+
+# ----------------------------------------------------------------------
+# 2. Memory-mapped Index
+# ----------------------------------------------------------------------
+class SpellIndex:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a spell index: {path}")
+
+        self._offset = len(MAGIC)
+        header = self._array(_HEADER, _HEADER_FIELDS)
+        self.max_distance, self.prefix_length, words, key_bytes, word_bytes, entries = map(int, header)
+        self._key_offsets = self._array("<u4", words + 1)
+        self._word_offsets = self._array("<u4", words + 1)
+        self.counts = self._array("<u4", words)
+        self._keys = self._array(np.uint8, key_bytes)
+        self._words = self._array(np.uint8, word_bytes)
+        self._hashes = self._array("<u8", entries)
+        self._word_ids = self._array("<u4", entries)
+        self.size = words
+        # Stand-in frequency of a word that is not in the lexicon (see suggest())
+        self.unknown_count = float(np.median(self.counts)) if words else 1.0
+
+    def _array(self, dtype, count):
+        self._offset += -self._offset % 8
+        array = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=self._offset)
+        self._offset += array.nbytes
+        return array
+
+    def _text(self, blob, offsets, word_id):
+        return blob[offsets[word_id]:offsets[word_id + 1]].tobytes().decode("utf-8")
+
+    def candidates(self, word, max_distance=None):
+        """Lexicon words within the (length-capped) distance as [(word, distance, count)], best first."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        key = normalize(word)
+        if not key:
+            return []
+        max_distance = distance_for(key, max_distance)
+
+        deletes = _deletes(key, max_distance, self.prefix_length)
+        queries = np.fromiter((_hash(delete) for delete in deletes), dtype="<u8", count=len(deletes))
+        starts = np.searchsorted(self._hashes, queries, side="left")
+        ends = np.searchsorted(self._hashes, queries, side="right")
+
+        candidates = set()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end > start:
+                candidates.update(self._word_ids[start:end].tolist())
+
+        found = []
+        for word_id in candidates:
+            distance = edit_distance(key, self._text(self._keys, self._key_offsets, word_id), max_distance)
+            if distance <= max_distance:
+                found.append((distance, -int(self.counts[word_id]), word_id))
+        return [(self._text(self._words, self._word_offsets, word_id), distance, -count)
+                for distance, count, word_id in sorted(found)]
+
+    def lookup(self, word, max_distance=None):
+        """Closest lexicon word as (word, distance), or None beyond max_distance."""
+        found = self.candidates(word, max_distance)
+        return found[0][:2] if found else None
+
+    def known(self, word):
+        """True for a lexicon word, also with a prefix from _PREFIXES attached."""
+        key = normalize(word)
+        stems = [key] + [key[len(p):] for p in _PREFIXES if key.startswith(p) and len(key) - len(p) > 1]
+        return any(self.candidates(stem, 0) for stem in stems)
+
+    def suggest(self, word, max_distance=None, min_ratio=None):
+        """
+        Replacement for `word` as (word, distance), or None to keep it. A known
+        word is never rewritten; an unknown one only when the best candidate is
+        `min_ratio` times as frequent as the runner-up at the same distance and
+        as a typical lexicon word (it may be a valid name the lexicon lacks).
+        """
+        min_ratio = config.SPELL_MIN_RATIO if min_ratio is None else min_ratio
+        if self.known(word):
+            return None
+        found = self.candidates(word, max_distance)
+        if not found:
+            return None
+        best, distance, count = found[0]
+        rival = max([c for _w, d, c in found[1:] if d == distance] + [self.unknown_count])
+        if count < min_ratio * rival:
+            return None
+        return best, distance
+
+    def correct(self, text, max_distance=None):
+        """Correct every Arabic word in `text`; returns (corrected, [per-word details])."""
+        tokens = []
+
+        def replace(match):
+            word = match.group(0)
+            found = self.suggest(word, max_distance)
+            suggestion, distance = found if found else (word, None)
+            tokens.append({"word": word, "suggestion": suggestion, "distance": distance})
+            return suggestion
+
+        return _ARABIC_WORD.sub(replace, text), tokens
+
+    def close(self):
+        # The arrays are views into the map; it cannot close while they exist
+        self.counts = self._key_offsets = self._word_offsets = None
+        self._keys = self._words = self._hashes = self._word_ids = None
+        self._mmap.close()
+
+
+# ----------------------------------------------------------------------
+# 3. Process-wide Instance
+# ----------------------------------------------------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def _stale(index_path, lexicon_path):
+    if not os.path.exists(index_path):
+        return True
+    return os.path.exists(lexicon_path) and os.path.getmtime(lexicon_path) > os.path.getmtime(index_path)
+
+
+def get_index():
+    """Shared SpellIndex (built from the lexicon when missing or older), or None without a lexicon."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if _stale(config.SPELL_INDEX_PATH, config.SPELL_LEXICON):
+                    if not os.path.exists(config.SPELL_LEXICON):
+                        print(f"[WARN] No spell index or lexicon at {config.SPELL_LEXICON}")
+                        return None
+                    build_index(config.SPELL_LEXICON, config.SPELL_INDEX_PATH)
+                _index = SpellIndex(config.SPELL_INDEX_PATH)
+                print(f"[INFO] Spell index loaded ({_index.size} words)")
+    return _index
+
+
+def correct_text(text):
+    """Corrected text, or `text` unchanged when no index is available."""
+    index = get_index()
+    if index is None or not text:
+        return text
+    return index.correct(text)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build / query the Arabic name correction index")
+    parser.add_argument("--lexicon", default=config.SPELL_LEXICON)
+    parser.add_argument("--output", default=config.SPELL_INDEX_PATH)
+    parser.add_argument("--max-distance", type=int, default=config.SPELL_MAX_DISTANCE)
+    parser.add_argument("--prefix-length", type=int, default=config.SPELL_PREFIX_LENGTH)
+    parser.add_argument("--lookup", nargs="+", help="Words to look up in the built index")
+    args = parser.parse_args(argv)
+
+    if not args.lookup:
+        if not os.path.exists(args.lexicon):
+            print(f"⚠️ Lexicon not found: {args.lexicon}")
+            return 1
+        build_index(args.lexicon, args.output, args.max_distance, args.prefix_length)
+        return 0
+
+    index = SpellIndex(args.output)
+    for word in args.lookup:
+        print(f"{word}\t{index.lookup(word)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import queue
+import shlex
+import threading
+import numpy as np
+
+import config
+
+try:
+    import tesserocr
+except ImportError:  # pytesseract fallback (one subprocess per call)
+    tesserocr = None
+
+import pytesseract
+
+if config.TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_CMD
+
+# ----------------------------------------------------------------------
+# 1. Config Parsing ("--psm 6 --oem 3 -l ara -c key=value")
+# ----------------------------------------------------------------------
+def parse_config(tess_config):
+    lang, psm, oem, variables = "eng", 3, 3, {}
+    tokens = shlex.split(tess_config)
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token == "-l":
+            lang = value
+        elif token == "--psm":
+            psm = int(value)
+        elif token == "--oem":
+            oem = int(value)
+        elif token == "-c" and value and "=" in value:
+            key, val = value.split("=", 1)
+            variables[key] = val
+        else:
+            i += 1
+            continue
+        i += 2
+
+    return lang, psm, oem, variables
+
+
+def use_tesserocr():
+    if config.TESSERACT_ENGINE == "pytesseract":
+        return False
+    if tesserocr is None:
+        if config.TESSERACT_ENGINE == "tesserocr":
+            raise RuntimeError("⚠️ OCR_TESSERACT_ENGINE=tesserocr but tesserocr is not installed")
+        return False
+    return True
+
+
+# ----------------------------------------------------------------------
+# 2. Pool of Long-lived Engines (one per config, traineddata stays loaded)
+# ----------------------------------------------------------------------
+class TesseractPool:
+    def __init__(self, size=None, tessdata=None, acquire_timeout=None):
+        self.size = size or config.TESSERACT_POOL_SIZE
+        self.tessdata = tessdata or config.TESSDATA_PREFIX
+        self.acquire_timeout = config.TESSERACT_ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+        self._idle = {}      # config -> Queue of idle engines
+        self._created = {}   # config -> number of engines created
+        self._lock = threading.Lock()
+
+    def _new_engine(self, tess_config):
+        lang, psm, oem, variables = parse_config(tess_config)
+        kwargs = {"lang": lang, "psm": psm, "oem": oem, "variables": variables}
+        if self.tessdata:
+            kwargs["path"] = self.tessdata
+        try:
+            return tesserocr.PyTessBaseAPI(**kwargs)
+        except RuntimeError as e:
+            raise RuntimeError(f"⚠️ Could not initialise Tesseract ({tess_config}): {e}")
+
+    def _acquire(self, tess_config):
+        with self._lock:
+            idle = self._idle.setdefault(tess_config, queue.Queue())
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._created.get(tess_config, 0) < self.size:
+                self._created[tess_config] = self._created.get(tess_config, 0) + 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._new_engine(tess_config)
+            except BaseException:
+                # Give the slot back, or failed inits would leave the pool "full" of nothing
+                with self._lock:
+                    self._created[tess_config] -= 1
+                raise
+        try:
+            return idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise RuntimeError(
+                f"⚠️ No Tesseract engine free within {self.acquire_timeout}s ({tess_config})"
+            ) from None
+
+    def _release(self, tess_config, engine):
+        self._idle[tess_config].put(engine)
+
+    def image_to_string(self, image, tess_config):
+        image = np.ascontiguousarray(image)
+        if image.ndim == 2:
+            bytes_per_pixel = 1
+        else:
+            image = np.ascontiguousarray(image[:, :, ::-1])  # BGR -> RGB
+            bytes_per_pixel = image.shape[2]
+        height, width = image.shape[:2]
+
+        engine = self._acquire(tess_config)
+        try:
+            engine.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, image.strides[0])
+            return engine.GetUTF8Text()
+        finally:
+            self._release(tess_config, engine)
+
+    def warmup(self, tess_configs):
+        for tess_config in tess_configs:
+            self.image_to_string(np.full((32, 128), 255, dtype=np.uint8), tess_config)
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().End()
+            self._idle.clear()
+            self._created.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TesseractPool()
+    return _pool
+
+
+# ----------------------------------------------------------------------
+# 3. Public Entry Point
+# ----------------------------------------------------------------------
+_backend = None
+
+
+def register_backend(fn):
+    """Replace the engine with `fn(image, tess_config) -> str` (benchmarks / stubs); None resets."""
+    global _backend
+    _backend = fn
+
+
+def image_to_string(image, tess_config):
+    """Drop-in for pytesseract.image_to_string using a persistent engine when available."""
+    if _backend is not None:
+        return _backend(image, tess_config)
+
+    if use_tesserocr():
+        return get_pool().image_to_string(image, tess_config)
+
+    try:
+        return pytesseract.image_to_string(image, config=tess_config)
+    except pytesseract.pytesseract.TesseractNotFoundError:
+        raise RuntimeError("⚠️ Tesseract not found! Please check the path configuration.")
+
+
+def warmup(tess_configs):
+    if _backend is None and use_tesserocr():
+        get_pool().warmup(tess_configs)
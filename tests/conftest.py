@@ -0,0 +1,18 @@
+import os
+import sys
+
+# The modules live at the repository root (no package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# No result cache / artifact writes while testing
+os.environ.setdefault("OCR_CACHE_ENABLED", "false")
+os.environ.setdefault("OCR_PERSIST_POLICY", "off")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def stub_models():
+    """Stub YOLO / EasyOCR / Tesseract backends (benchmarks.stubs), no weights needed."""
+    from benchmarks.stubs import install_stub_models, install_stub_tesseract
+    install_stub_models()
+    install_stub_tesseract()
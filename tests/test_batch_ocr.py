@@ -0,0 +1,121 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import batch_ocr
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fake_ocr(data, application_number, persist):
+    return {"application_number": application_number, "bytes": len(data)}, None
+
+
+@pytest.fixture
+def in_process(monkeypatch):
+    """Run the OCR "processes" as threads with a fake pipeline (no models)."""
+    monkeypatch.setattr(batch_ocr, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(batch_ocr, "_init_worker", lambda: None)
+    monkeypatch.setattr(batch_ocr, "_ocr", fake_ocr)
+
+
+def write_image(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ok, encoded = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))
+    with open(path, "wb") as f:
+        f.write(encoded.tobytes())
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_same_stem_in_two_folders_is_not_skipped(tmp_path, in_process):
+    scans = tmp_path / "scans"
+    write_image(str(scans / "a" / "123.png"))
+    write_image(str(scans / "b" / "123.png"))
+    output = str(tmp_path / "results.jsonl")
+
+    assert batch_ocr.run(str(scans), output, workers=2, progress_every=0) == (2, 0)
+    assert sorted(os.path.basename(os.path.dirname(r["path"])) for r in read_rows(output)) == ["a", "b"]
+
+    # Resume: everything is checkpointed, nothing is redone
+    assert batch_ocr.run(str(scans), output, workers=2, progress_every=0) == (0, 0)
+
+
+def test_reused_manifest_number_is_not_skipped(tmp_path, in_process):
+    write_image(str(tmp_path / "x.png"))
+    write_image(str(tmp_path / "y.png"))
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("path,application_number\nx.png,APP-1\ny.png,APP-1\n", encoding="utf-8")
+    output = str(tmp_path / "results.jsonl")
+
+    assert batch_ocr.run(str(manifest), output, workers=1, progress_every=0) == (2, 0)
+
+
+def killing_ocr(data, application_number, persist):
+    if application_number == "crash":
+        os._exit(1)  # the worker process dies: BrokenProcessPool
+    return fake_ocr(data, application_number, persist)
+
+
+def test_dead_worker_does_not_abort_the_run(tmp_path, monkeypatch):
+    # Real worker processes (forked, so the patched functions are visible to them)
+    monkeypatch.setattr(batch_ocr, "_init_worker", lambda: None)
+    monkeypatch.setattr(batch_ocr, "_ocr", killing_ocr)
+    scans = tmp_path / "scans"
+    for name in ("a", "b", "crash", "c", "d"):
+        write_image(str(scans / f"{name}.png"))
+    output = str(tmp_path / "results.jsonl")
+
+    assert batch_ocr.run(str(scans), output, workers=2, progress_every=0, max_crashes=2) == (5, 1)
+    rows = {r["application_number"]: r for r in read_rows(output)}
+    assert {name: row["status"] for name, row in rows.items()} == \
+        {"a": "ok", "b": "ok", "c": "ok", "d": "ok", "crash": "error"}
+    assert "crashed 2 times" in rows["crash"]["error"]
+
+    # Checkpointed as failed: a resume does not try it again
+    assert batch_ocr.run(str(scans), output, workers=2, progress_every=0, max_crashes=2) == (0, 0)
+
+
+def test_innocent_items_survive_a_crash(tmp_path, in_process, monkeypatch):
+    scans = tmp_path / "scans"
+    for name in ("a", "b", "c", "d"):
+        write_image(str(scans / f"{name}.png"))
+    output = str(tmp_path / "results.jsonl")
+    crashes = []
+
+    def flaky_ocr(data, application_number, persist):
+        if application_number == "b" and not crashes:
+            crashes.append(application_number)
+            raise RuntimeError("worker process died")  # what future.result() raises on a crash
+        return fake_ocr(data, application_number, persist)
+
+    monkeypatch.setattr(batch_ocr, "_ocr", flaky_ocr)
+    assert batch_ocr.run(str(scans), output, workers=2, progress_every=0) == (4, 0)
+    assert sorted(r["application_number"] for r in read_rows(output)) == ["a", "b", "c", "d"]
+
+
+def test_crash_count_carries_over_between_runs(tmp_path, in_process, monkeypatch):
+    scans = tmp_path / "scans"
+    write_image(str(scans / "good.png"))
+    write_image(str(scans / "crash.png"))
+    (scans / "broken.png").write_bytes(b"not an image")
+    output = str(tmp_path / "results.jsonl")
+    key = batch_ocr.checkpoint_key(str(scans / "crash.png"), "crash")
+    with open(f"{output}.checkpoint.crashes", "w", encoding="utf-8") as f:
+        f.write(f"{key}\n" * 4)  # four crashes in earlier, interrupted runs
+
+    def crashing_ocr(data, application_number, persist):
+        if application_number == "crash":
+            raise RuntimeError("worker process died")
+        return fake_ocr(data, application_number, persist)
+
+    monkeypatch.setattr(batch_ocr, "_ocr", crashing_ocr)
+    assert batch_ocr.run(str(scans), output, workers=1, progress_every=0, max_crashes=5) == (3, 2)
+    rows = {r["application_number"]: r["status"] for r in read_rows(output)}
+    assert rows == {"good": "ok", "broken": "error", "crash": "error"}
+    assert batch_ocr.load_crashes(f"{output}.checkpoint.crashes")[key] == 5
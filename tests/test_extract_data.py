@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import functools
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+import extract_data
+
+PAGES = ("a", "b", "c")
+
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    """Static pages with a delay, recording how many requests overlap."""
+
+    delay = 0.3
+    send_last_modified = True
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(self.delay)
+            super().do_GET()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def send_header(self, keyword, value):
+        if keyword == "Last-Modified" and not self.send_last_modified:
+            return
+        super().send_header(keyword, value)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    for name in PAGES:
+        (root / f"{name}.html").write_text(
+            f"<html><head><title>{name}</title></head><body><p>page {name}</p></body></html>",
+            encoding="utf-8",
+        )
+
+    handler = type("Handler", (SlowHandler,), {"in_flight": 0, "max_in_flight": 0})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, handler, [f"http://127.0.0.1:{server.server_port}/{name}.html" for name in PAGES]
+    server.shutdown()
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Count pages that were actually rendered in a browser tab."""
+    rendered = []
+    wait_until_ready = extract_data.wait_until_ready
+
+    async def counting(page, *args):
+        rendered.append(page.url)
+        await wait_until_ready(page, *args)
+
+    monkeypatch.setattr(extract_data, "wait_until_ready", counting)
+    return rendered
+
+
+def options(tmp_path, **overrides):
+    values = dict(output=str(tmp_path / "pages.jsonl"), state=None, concurrency=3, ready_selector="body",
+                  settle_ms=50, timeout_ms=30000, html_dir=None, full=False, always_render=False)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def touch(path, text):
+    path.write_text(text, encoding="utf-8")
+    later = time.time() + 10  # Last-Modified has one-second resolution
+    os.utime(path, (later, later))
+
+
+def test_pages_load_concurrently(tmp_path, site, renders):
+    _root, handler, urls = site
+    counts = asyncio.run(extract_data.export_pages(urls, options(tmp_path)))
+
+    assert counts["exported"] == 3
+    assert handler.max_in_flight >= 2
+    with open(tmp_path / "pages.jsonl", encoding="utf-8") as f:
+        assert sorted(json.loads(line)["title"] for line in f) == list(PAGES)
+
+
+def test_rerun_skips_unchanged_pages_without_rendering(tmp_path, site, renders):
+    root, _handler, urls = site
+    asyncio.run(extract_data.export_pages(urls, options(tmp_path)))
+    renders.clear()
+
+    touch(root / "b.html", "<html><head><title>b</title></head><body><p>page b v2</p></body></html>")
+    counts = asyncio.run(extract_data.export_pages(urls, options(tmp_path)))
+
+    assert (counts["exported"], counts["not_modified"]) == (1, 2)
+    assert renders == [urls[1]]
+
+
+def test_same_html_is_skipped_without_validators(tmp_path, site, renders):
+    _root, handler, urls = site
+    handler.send_last_modified = False
+    asyncio.run(extract_data.export_pages(urls, options(tmp_path)))
+    renders.clear()
+
+    counts = asyncio.run(extract_data.export_pages(urls, options(tmp_path)))
+    assert counts["unchanged"] == 3
+    assert renders == []
+
+    # App shells: render anyway, still nothing new to write
+    counts = asyncio.run(extract_data.export_pages(urls, options(tmp_path, always_render=True)))
+    assert counts["unchanged"] == 3
+    assert len(renders) == 3
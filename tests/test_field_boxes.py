@@ -0,0 +1,64 @@
+import cv2
+
+import model_registry
+import utils
+from benchmarks.stubs import StubBox, StubDetector, StubResult, detect_fields
+from benchmarks.synthetic import FIELD_CLASSES, FIELD_LAYOUT, generate_card
+
+NID_CLASS = {name: cls for cls, name in FIELD_CLASSES.items()}["nid"]
+REAL_ID = "29801011234561"
+DECOY_ID = "30001011234567"
+
+
+def test_best_field_boxes_keeps_highest_confidence():
+    names = {0: "nid", 1: "serial"}
+    result = StubResult([
+        StubBox([0, 0, 10, 10], 0, 0.40),
+        StubBox([20, 20, 90, 40], 0, 0.90),
+        StubBox([5, 5, 15, 15], 0, 0.60),
+        StubBox([1, 2, 3, 4], 1, 0.50),
+    ], names)
+
+    assert utils.best_field_boxes([result]) == {"nid": [20, 20, 90, 40], "serial": [1, 2, 3, 4]}
+
+
+def _fields_with_decoy(image):
+    # A small low-confidence nid box first, then the real one
+    return [([2, 2, 40, 12], NID_CLASS, 0.30)] + detect_fields(image)
+
+
+def _digits_by_width(image):
+    # Decoy strip is narrow; the real nid strip is wide
+    national_id = REAL_ID if image.shape[1] > 100 else DECOY_ID
+    step = image.shape[1] / len(national_id)
+    return [([i * step, 0, (i + 1) * step, image.shape[0]], int(d), 0.9) for i, d in enumerate(national_id)]
+
+
+def test_single_and_batch_paths_pick_the_same_nid_box(stub_models):
+    model_registry.register_model(
+        model_registry.FIELDS_MODEL, lambda _n: StubDetector(_fields_with_decoy, dict(FIELD_CLASSES))
+    )
+    model_registry.register_model(
+        model_registry.DIGITS_MODEL, lambda _n: StubDetector(_digits_by_width, {i: str(i) for i in range(10)})
+    )
+    image, _truth = generate_card(3)
+
+    single = utils.detect_and_process_id_card(image, "single", persist=False)
+    [(batch, error)] = utils.detect_and_process_id_cards_batch([(image, "batch")], persist=False)
+
+    assert error is None
+    assert single[3] == REAL_ID
+    assert batch[3] == REAL_ID
+
+
+def test_denoise_fields_matches_per_field_preprocessing():
+    card = cv2.resize(generate_card(0)[0], (1013, 638))
+    height, width = card.shape[:2]
+    boxes = [(int(x1 * width), int(y1 * height), int(x2 * width), int(y2 * height))
+             for x1, y1, x2, y2 in (FIELD_LAYOUT[f] for f in ("firstName", "lastName", "address"))]
+
+    denoised = utils.denoise_fields(card, boxes)
+    for x1, y1, x2, y2 in boxes:
+        expected = utils.preprocess_image(card[y1:y2, x1:x2])
+        assert (utils.threshold_field(denoised, (x1, y1, x2, y2)) == expected).all()
+    assert not denoised[int(0.76 * height):, :].any()  # nid / serial rows are never filtered
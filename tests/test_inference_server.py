@@ -0,0 +1,52 @@
+import os
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import numpy as np
+import pytest
+
+import config
+import inference_client
+import inference_server
+import model_registry
+
+
+@pytest.fixture
+def server(tmp_path, stub_models, monkeypatch):
+    address = str(tmp_path / "inference.sock")
+    monkeypatch.setattr(config, "INFERENCE_SOCKET", address)
+    monkeypatch.setattr(config, "INFERENCE_AUTHKEY", "")
+    monkeypatch.setattr(config, "PRELOAD_MODELS", False)
+    # The server thread shares this process: it must run the models itself, not forward
+    monkeypatch.setattr(model_registry, "_remote", lambda: None)
+    threading.Thread(target=inference_server.InferenceServer(address).serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.02)
+    yield address
+    inference_client._local.conn = None
+
+
+def test_socket_and_key_are_owner_only(server):
+    assert stat.S_IMODE(os.stat(server).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(inference_client.authkey_path(server)).st_mode) == 0o600
+
+
+def test_client_without_the_key_is_rejected(server):
+    with pytest.raises(AuthenticationError):
+        Client(server, family="AF_UNIX", authkey=b"wrong key")
+
+
+def test_predict_through_the_server(server):
+    assert inference_client.wait_until_ready(timeout=5)
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    [remote] = inference_client.predict(model_registry.ID_CARD_MODEL, image)
+    [local] = model_registry.predict(model_registry.ID_CARD_MODEL, image)
+    assert len(remote.boxes) == len(local.boxes)
+    for a, b in zip(remote.boxes, local.boxes):
+        assert int(a.cls) == int(b.cls)
+        assert float(a.conf) == pytest.approx(float(b.conf))
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def test_job_lifecycle(db_path):
+    queue = JobQueue(db_path, owner="a")
+    first = queue.submit("a.jpg", "1")
+    second = queue.submit("b.jpg", "2", "https://backend/done")
+
+    job = queue.claim_next()
+    assert (job["id"], job["status"], job["owner"], job["attempts"]) == (first, RUNNING, "a", 1)
+    queue.complete(first, {"nid": "29801011234561"})
+
+    job = queue.claim_next()
+    assert job["id"] == second
+    queue.fail(second, "boom")
+    assert queue.claim_next() is None
+
+    assert queue.get(first)["status"] == DONE
+    assert queue.get(first)["result"] == {"nid": "29801011234561"}
+    assert (queue.get(second)["status"], queue.get(second)["error"]) == (FAILED, "boom")
+    assert queue.counts() == {DONE: 1, FAILED: 1}
+
+
+def test_requeue_puts_the_job_back(db_path):
+    queue = JobQueue(db_path, owner="a")
+    job_id = queue.submit("a.jpg", "1")
+    queue.claim_next()
+    queue.requeue(job_id)
+
+    job = queue.get(job_id)
+    assert (job["status"], job["owner"], job["attempts"]) == (QUEUED, None, 0)
+    assert queue.claim_next()["id"] == job_id
+
+
+def test_each_job_is_claimed_once_across_processes(db_path):
+    # Separate connections behave like separate API processes sharing the file
+    queues = [JobQueue(db_path, owner=f"worker-{i}") for i in range(4)]
+    submitted = {queues[0].submit(f"{i}.jpg", str(i)) for i in range(40)}
+
+    claimed = [[] for _ in queues]
+
+    def drain(queue, out):
+        while (job := queue.claim_next()) is not None:
+            out.append(job["id"])
+
+    threads = [threading.Thread(target=drain, args=pair) for pair in zip(queues, claimed)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    everything = [job_id for ids in claimed for job_id in ids]
+    assert sorted(everything) == sorted(submitted)
+    assert all(queues[0].get(job_id)["attempts"] == 1 for job_id in submitted)
+
+
+def test_recover_only_requeues_stale_jobs(db_path):
+    alive, dead = JobQueue(db_path, owner="alive"), JobQueue(db_path, owner="dead")
+    alive_id = alive.submit("a.jpg", "1")
+    dead_id = alive.submit("b.jpg", "2")
+    alive.claim_next()
+    dead.claim_next()
+
+    # Nothing is stale yet: a restarting sibling must not steal live work
+    assert alive.recover(stale_after=60) == 0
+
+    dead._conn.execute("UPDATE jobs SET heartbeat = heartbeat - 120 WHERE id = ?", (dead_id,))
+    dead._conn.commit()
+    alive.heartbeat()
+    assert alive.recover(stale_after=60) == 1
+    assert alive.get(alive_id)["status"] == RUNNING
+    assert alive.get(dead_id)["status"] == QUEUED
+
+    # The old owner finishing late does not overwrite the re-claimed job
+    assert alive.claim_next()["id"] == dead_id
+    dead.complete(dead_id, {"stale": True})
+    assert alive.get(dead_id)["status"] == RUNNING
+
+
+@pytest.mark.parametrize("url", ["file:///etc/passwd", "ftp://host/x", "backend/done", "http://"])
+def test_callback_url_must_be_http(db_path, url):
+    with pytest.raises(ValueError):
+        JobQueue(db_path).submit("a.jpg", "1", url)
@@ -0,0 +1,76 @@
+import csv
+
+import numpy as np
+import pytest
+
+from national_id import CHECK_WEIGHTS, InvalidNationalIdError, decode_file, decode_national_id, decode_national_ids
+
+
+def with_check_digit(prefix):
+    """Scalar reference for the mod-11 check digit."""
+    total = sum(int(d) * w for d, w in zip(prefix, CHECK_WEIGHTS.tolist()))
+    return prefix + str((11 - total % 11) % 10)
+
+
+VALID = with_check_digit("2980101" + "01" + "1235")   # 1998-01-01, Cairo, sequence 123, odd = male
+
+
+def test_check_digit_matches_the_scalar_reference():
+    rng = np.random.default_rng(0)
+    ids = ["".join(map(str, rng.integers(0, 10, 13))) for _ in range(1000)]
+    ids = [with_check_digit(prefix) for prefix in ids]
+    assert decode_national_ids(ids)["valid_check_digit"].all()
+
+    wrong = [i[:13] + str((int(i[13]) + 1) % 10) for i in ids]
+    assert not decode_national_ids(wrong)["valid_check_digit"].any()
+
+
+def test_decode_fields():
+    decoded = decode_national_id(VALID)
+    assert decoded["birth_date"] == "1998-01-01"
+    assert decoded["governorate"] == "Cairo"
+    assert decoded["gender"] == "Male"
+    assert decoded["valid"] is True
+
+    female = decode_national_id(with_check_digit("3050229" + "21" + "0012"))
+    assert (female["birth_date"], female["governorate"], female["gender"]) == ("2005-02-29", "Giza", "Female")
+    assert female["valid_date"] is False  # 2005 is not a leap year
+
+
+@pytest.mark.parametrize("nid, failed", [
+    (with_check_digit("3000229" + "01" + "1234"), None),                  # 2000 is a leap year
+    (with_check_digit("2000229" + "01" + "1234"), "valid_date"),          # 1900 is not
+    (with_check_digit("2981301" + "01" + "1234"), "valid_date"),
+    (with_check_digit("2980101" + "99" + "1234"), "valid_governorate"),
+    (with_check_digit("4980101" + "01" + "1234"), "valid_century"),
+    (VALID[:13] + str((int(VALID[13]) + 1) % 10), "valid_check_digit"),
+])
+def test_checks(nid, failed):
+    decoded = decode_national_ids([nid])
+    assert bool(decoded["valid"][0]) is (failed is None)
+    if failed:
+        assert not decoded[failed][0]
+
+
+@pytest.mark.parametrize("nid", ["", "123", VALID + "0", VALID[:13] + "x", "٢٩٨٠١٠١٠١١٢٣٤٥"])
+def test_malformed_ids(nid):
+    decoded = decode_national_ids([nid, VALID])
+    assert list(decoded["valid_format"]) == [False, True]
+    assert decoded["gender"][0] == "" and decoded["birth_date"][0] == ""
+    with pytest.raises(InvalidNationalIdError):
+        decode_national_id(nid)
+
+
+def test_decode_file_in_chunks(tmp_path):
+    source, output = tmp_path / "ids.csv", tmp_path / "decoded.csv"
+    ids = [VALID, " " + VALID + " ", "bad", with_check_digit("2980101" + "99" + "1234")]
+    with open(source, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([["nid"]] + [[i] for i in ids])
+
+    summary = decode_file(str(source), str(output), column="nid", chunksize=3)
+    assert (summary["rows"], summary["valid"], summary["invalid_format"], summary["invalid_governorate"]) == (4, 2, 1, 2)
+
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["national_id"] for row in rows] == [VALID, VALID, "bad", ids[3]]
+    assert [row["valid"] for row in rows] == ["True", "True", "False", "False"]
@@ -0,0 +1,96 @@
+import sqlite3
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from result_cache import ResultCache, content_hash, perceptual_hash
+
+VALUE = ("أحمد", "محمد", "القاهرة", "29801011234561", "", "AB1234567")
+
+
+def card(seed=0):
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (320, 240))
+
+
+def flip_bits(phash, count):
+    return phash ^ ((1 << count) - 1)
+
+
+def test_keys():
+    image = card()
+    assert content_hash(image) == content_hash(image.copy())
+    assert content_hash(image) != content_hash(card(1))
+
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    reencoded = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    assert content_hash(reencoded) != content_hash(image)
+    assert bin(perceptual_hash(reencoded) ^ perceptual_hash(image)).count("1") <= 3
+
+
+def test_memory_tier_lru_and_ttl(monkeypatch):
+    cache = ResultCache(max_entries=2, ttl=60, db_path="")
+    for key in "abc":
+        cache.put(key, None, VALUE)
+    assert cache.get("a") is None  # evicted, least recently used
+    assert cache.get("c") == VALUE
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get("c") is None
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(db_path=path).put("k", None, VALUE)
+
+    cache = ResultCache(db_path=path)
+    assert cache.get("k") == VALUE
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("k") == VALUE
+    assert cache.stats()["memory_hits"] == 1  # promoted
+
+
+@pytest.mark.parametrize("disk", [False, True])
+def test_phash_distance_is_honoured_by_both_tiers(tmp_path, disk):
+    path = str(tmp_path / "cache.sqlite3") if disk else ""
+    ResultCache(use_phash=True, phash_distance=3, db_path=path).put("k", 0x0123456789ABCDEF, VALUE)
+    if disk:
+        cache = ResultCache(use_phash=True, phash_distance=3, db_path=path, max_entries=1)
+    else:
+        cache = ResultCache(use_phash=True, phash_distance=3, db_path=path)
+        cache.put("k", 0x0123456789ABCDEF, VALUE)
+
+    assert cache.get("other", flip_bits(0x0123456789ABCDEF, 3)) == VALUE
+    assert cache.get("other", flip_bits(0x0123456789ABCDEF, 4)) is None
+    assert cache.stats()["phash_hits"] == 1
+
+
+def test_disk_tier_finds_near_matches_across_bands(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(use_phash=True, phash_distance=3, db_path=path).put("k", 0, VALUE)
+    cache = ResultCache(use_phash=True, phash_distance=3, db_path=path)
+
+    # One bit in each of three bands: only the fourth band still matches exactly
+    assert cache.get("other", (1 << 0) | (1 << 16) | (1 << 32)) == VALUE
+
+
+def test_old_disk_rows_get_bands(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (key TEXT PRIMARY KEY, phash TEXT, value TEXT NOT NULL, created REAL NOT NULL)")
+    conn.execute("INSERT INTO results VALUES ('k', ?, '[\"x\"]', ?)", (format(0xFF, "016x"), time.time()))
+    conn.commit()
+    conn.close()
+
+    cache = ResultCache(use_phash=True, phash_distance=1, db_path=path)
+    assert cache.get("other", 0xFE) == ("x",)
+
+
+def test_large_distance_is_rejected_with_the_disk_tier(tmp_path):
+    with pytest.raises(ValueError):
+        ResultCache(use_phash=True, phash_distance=4, db_path=str(tmp_path / "cache.sqlite3"))
+    ResultCache(use_phash=True, phash_distance=4, db_path="")  # memory only: any distance
@@ -0,0 +1,47 @@
+import pytest
+
+import config
+from spell_index import SpellIndex, build_index, distance_for, edit_distance, normalize
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("spell") / "lexicon.symspell"
+    build_index(config.SPELL_LEXICON, str(path))
+    index = SpellIndex(str(path))
+    yield index
+    index.close()
+
+
+def test_normalize_and_distance():
+    assert normalize("أحمد") == normalize("احمد")
+    assert normalize("الجيزة") == normalize("الجيزه")
+    assert edit_distance("محمد", "محمط", 2) == 1
+    assert edit_distance("ab", "ba", 2) == 1  # transposition
+    assert edit_distance("محمد", "ابراهيم", 2) == 3  # "too far"
+
+
+def test_distance_is_capped_by_length():
+    assert [distance_for("x" * n, 2) for n in (3, 4, 5, 6)] == [0, 1, 1, 2]
+
+
+def test_lookup(index):
+    assert index.lookup("محمط") == ("محمد", 1)
+    assert index.lookup("مصطفي") == ("مصطفى", 0)
+    assert index.lookup("علا") is None  # 3 letters: exact matches only
+
+
+@pytest.mark.parametrize("text", [
+    "سامح علا",         # valid names missing from the lexicon
+    "الشارع والشارع",   # known word with the article / conjunction
+    "احمد الجيزه",      # known words in another spelling
+    "حسبن",             # ambiguous: حسن and حسين are both one edit away
+])
+def test_correct_leaves_text_alone(index, text):
+    assert index.correct(text)[0] == text
+
+
+def test_correct_fixes_clear_typos(index):
+    corrected, tokens = index.correct("محمط احمد - ابراهبم")
+    assert corrected == "محمد احمد - إبراهيم"
+    assert [(t["suggestion"], t["distance"]) for t in tokens] == [("محمد", 1), ("احمد", None), ("إبراهيم", 1)]
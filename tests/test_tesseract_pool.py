@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+import tesseract_engine
+from tesseract_engine import TesseractPool, parse_config
+
+
+class FakeEngine:
+    def __init__(self, tess_config):
+        self.tess_config = tess_config
+        self.ended = False
+
+    def End(self):
+        self.ended = True
+
+
+class FakePool(TesseractPool):
+    """TesseractPool with fake engines (tesserocr is not needed); the first `failures` inits raise."""
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.inits = 0
+
+    def _new_engine(self, tess_config):
+        self.inits += 1
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("bad tessdata")
+        return FakeEngine(tess_config)
+
+
+def test_parse_config():
+    assert parse_config("--psm 7 --oem 1 -l ara -c tessedit_char_whitelist=0123") == (
+        "ara", 7, 1, {"tessedit_char_whitelist": "0123"}
+    )
+
+
+def test_engines_are_reused():
+    pool = FakePool(size=2)
+    first = pool._acquire("-l ara")
+    pool._release("-l ara", first)
+    assert pool._acquire("-l ara") is first
+    assert pool.inits == 1
+
+
+def test_failed_init_frees_its_slot():
+    pool = FakePool(size=2, failures=2, acquire_timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="bad tessdata"):
+            pool._acquire("-l ara")
+
+    # Both slots were given back: the next call creates an engine instead of waiting forever
+    engine = pool._acquire("-l ara")
+    assert isinstance(engine, FakeEngine)
+    assert pool._created["-l ara"] == 1
+
+
+def test_acquire_times_out_when_every_engine_is_busy():
+    pool = FakePool(size=1, acquire_timeout=0.05)
+    busy = pool._acquire("-l ara")
+    with pytest.raises(RuntimeError, match="No Tesseract engine free"):
+        pool._acquire("-l ara")
+
+    # Released engines are handed to a waiting caller
+    threading.Timer(0.01, pool._release, args=("-l ara", busy)).start()
+    pool.acquire_timeout = 2.0
+    assert pool._acquire("-l ara") is busy
+
+
+def test_close_ends_idle_engines():
+    pool = FakePool(size=1)
+    engine = pool._acquire("-l ara")
+    pool._release("-l ara", engine)
+    pool.close()
+    assert engine.ended
+
+
+def test_registered_backend_replaces_the_engine():
+    tesseract_engine.register_backend(lambda image, tess_config: f"stub {tess_config}")
+    try:
+        assert tesseract_engine.image_to_string(None, "-l ara") == "stub -l ara"
+    finally:
+        tesseract_engine.register_backend(None)
@@ -0,0 +1,36 @@
+import pytest
+
+from variant_engine import VariantStats, match_serial
+
+
+def test_match_serial():
+    assert match_serial("AB 12345") is None
+    assert match_serial("xx AB1234567\n") == "AB1234567"
+    assert match_serial("AB 12O4567") == "AB1204567"
+
+
+def test_untimed_records_do_not_dilute_the_cost():
+    stats = VariantStats(["a", "b"], cost_priors=[0.1, 0.1])
+    stats.record(0, True, seconds=0.2)
+    for _ in range(9):
+        stats.record(0, True)  # batched round: no per-variant time
+
+    snapshot = stats.snapshot()["a"]
+    assert (snapshot["attempts"], snapshot["hits"], snapshot["avg_ms"]) == (10, 10, 200.0)
+    assert stats._cost(0) == pytest.approx(0.2)
+    assert stats.snapshot()["b"]["avg_ms"] is None
+
+
+def test_order_prefers_hits_per_second():
+    stats = VariantStats(["slow", "fast", "miss"], cost_priors=[0.1, 0.1, 0.1])
+    for _ in range(5):
+        stats.record(0, True, seconds=0.4)
+        stats.record(1, True, seconds=0.1)
+        stats.record(2, False, seconds=0.2)
+    assert stats.order() == [1, 0, 2]
+
+    # Untimed hits raise the hit rate without pretending the variant got cheaper
+    for _ in range(50):
+        stats.record(0, True)
+    assert stats._cost(0) == pytest.approx(0.4)
+    assert stats.order()[0] == 1
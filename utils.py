@@ -1,68 +1,265 @@
 import os
 import cv2
-import pytesseract
 import numpy as np
-from ultralytics import YOLO
 import re
+import time
 from PIL import Image
-import json
-import easyocr
+import config
+import tesseract_engine
+from image_io import decode_image_bytes, CardImage
+from result_cache import get_cache
+from metrics import stage, count_detection_failure, count_regex_miss, count_nid_attempt
+import persistence
+import events
+from model_registry import ID_CARD_MODEL, FIELDS_MODEL, DIGITS_MODEL, predict
+from variant_engine import VariantEngine
+from national_id import decode_national_id, decode_national_ids
+from worker_pool import run_parallel
+from spell_index import correct_text
 # ----------------------------------------------------------------------
-# 1. Configure Tesseract Path (IMPORTANT for Windows)
+# 1. Tesseract Binary
 # ----------------------------------------------------------------------
-pytesseract.pytesseract.tesseract_cmd = r"C:\Users\mohamed.abdallateaf\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
+# Set with OCR_TESSERACT_CMD (config.py); nothing is configured at import
 
 # ----------------------------------------------------------------------
 # 2. Tesseract Configurations (Arabic + English)
 # ----------------------------------------------------------------------
 tess_config_ar = "--psm 6 --oem 3 -l ara"
 tess_config_en = "--psm 6 --oem 3 -l eng"
+# Single line, Arabic-Indic or Latin digits only (national ID fallback)
+tess_config_digits = "--psm 7 --oem 3 -l ara -c tessedit_char_whitelist=0123456789٠١٢٣٤٥٦٧٨٩"
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
 
 # ----------------------------------------------------------------------
 # 3. Paths for Saving Data
 # ----------------------------------------------------------------------
-BASE_DIR = r"D:/egyption id"
+# Created by the background writer on first use, not at import
+BASE_DIR = config.ARTIFACTS_DIR
 IMAGES_DIR = os.path.join(BASE_DIR, "images")
 ANNOTATIONS_DIR = os.path.join(BASE_DIR, "annotations")
 LABELS_DIR = os.path.join(BASE_DIR, "labels")
 
-os.makedirs(IMAGES_DIR, exist_ok=True)
-os.makedirs(ANNOTATIONS_DIR, exist_ok=True)
-os.makedirs(LABELS_DIR, exist_ok=True)
-
 # ----------------------------------------------------------------------
 # 4. Preprocess Image for Better OCR Results
 # ----------------------------------------------------------------------
-def preprocess_image(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    gray = cv2.bilateralFilter(gray, 11, 17, 17)  # Reduce noise
+_guided_warned = False
+
+
+def denoise_image(image):
+    """Grayscale + the OCR_DENOISE_FILTER edge-preserving filter."""
+    global _guided_warned
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    size, sigma = config.DENOISE_SIZE, config.DENOISE_SIGMA
+
+    if config.DENOISE_FILTER == "bilateral":
+        return cv2.bilateralFilter(gray, size, sigma, sigma)
+    if config.DENOISE_FILTER == "median":
+        return cv2.medianBlur(gray, size | 1)
+    if config.DENOISE_FILTER == "guided":
+        if hasattr(cv2, "ximgproc"):
+            # eps is on the 0-255 intensity scale squared
+            return cv2.ximgproc.guidedFilter(gray, gray, size, sigma * sigma)
+        if not _guided_warned:
+            _guided_warned = True
+            print("[WARN] Guided filter needs opencv-contrib-python; using the bilateral filter")
+        return cv2.bilateralFilter(gray, size, sigma, sigma)
+    return gray
+
+
+def denoise_fields(image, boxes):
+    """
+    Card-sized grayscale buffer with only `boxes` (the Tesseract fields)
+    filled in, each denoised on its own exactly like preprocessing its crop;
+    the photo, nid and serial regions are never converted or filtered.
+    """
+    denoised = np.zeros(image.shape[:2], dtype=np.uint8)
+    for x1, y1, x2, y2 in boxes:
+        # Each field from the original pixels, so overlapping boxes do not affect each other
+        denoised[y1:y2, x1:x2] = denoise_image(image[y1:y2, x1:x2])
+    return denoised
+
+
+def threshold_field(gray, bbox=None):
+    """Binarise one field of a denoised card; the field is read through a view, not copied."""
+    if bbox is not None:
+        x1, y1, x2, y2 = bbox
+        gray = gray[y1:y2, x1:x2]
+    if config.FIELD_THRESHOLD == "adaptive":
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                     config.FIELD_THRESHOLD_BLOCK | 1, config.FIELD_THRESHOLD_C)
     _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     return thresh
 
+
+def preprocess_image(image):
+    return threshold_field(denoise_image(image))
+
 # ----------------------------------------------------------------------
 # 5. Extract Text Using Tesseract (Arabic / English)
 # ----------------------------------------------------------------------
-def extract_text_tesseract(image, bbox, lang='ara'):
-    x1, y1, x2, y2 = bbox
-    cropped = image[y1:y2, x1:x2]
-    preprocessed = preprocess_image(cropped)
+def extract_text_tesseract(image, bbox, lang='ara', denoised=None):
+    # denoised: the card already through denoise_fields (shared by all fields)
+    if denoised is None:
+        x1, y1, x2, y2 = bbox
+        preprocessed = preprocess_image(image[y1:y2, x1:x2])
+    else:
+        preprocessed = threshold_field(denoised, bbox)
 
-    try:
-        if lang == 'ara':
-            text = pytesseract.image_to_string(preprocessed, config=tess_config_ar)
-        else:
-            text = pytesseract.image_to_string(preprocessed, config=tess_config_en)
-    except pytesseract.pytesseract.TesseractNotFoundError:
-        raise RuntimeError("⚠️ Tesseract not found! Please check the path configuration.")
+    # Persistent in-process engine when tesserocr is installed, pytesseract otherwise
+    if lang == 'ara':
+        text = tesseract_engine.image_to_string(preprocessed, tess_config_ar)
+    else:
+        text = tesseract_engine.image_to_string(preprocessed, tess_config_en)
 
     return text.strip()
 
+
+def warmup_tesseract():
+    tesseract_engine.warmup([tess_config_ar])
+
 # ----------------------------------------------------------------------
 # 6. Detect National ID Digits Using YOLO
 # ----------------------------------------------------------------------
-def detect_national_id(cropped_image):
-    model = YOLO('detect_id.pt')
-    results = model(cropped_image)
+def nid_region(cropped_image, bbox, pad=None):
+    """
+    View of the `nid` field padded by OCR_NID_PAD (fraction of the box height),
+    so digits cut by a tight detection are kept. No copy is made.
+    """
+    pad = config.NID_PAD if pad is None else pad
+    x1, y1, x2, y2 = bbox
+    margin = int(round((y2 - y1) * pad))
+    height, width = cropped_image.shape[:2]
+    return cropped_image[max(0, y1 - margin):min(height, y2 + margin),
+                         max(0, x1 - margin):min(width, x2 + margin)]
+
+
+def read_national_id(cropped_image, bbox=None):
+    """
+    Run the digit model on the padded `nid` region (whole card if bbox is None)
+    at OCR_NID_IMGSZ. Returns (id_number, per-digit confidences).
+    """
+    region = cropped_image if bbox is None else nid_region(cropped_image, bbox)
+    results = predict(DIGITS_MODEL, region, imgsz=config.NID_IMGSZ)
+    return national_id_digits(results)
+
+
+# --- Validation-gated retry cascade (nid field only) ---
+def nid_passes_gate(id_number):
+    """True when `id_number` passes every check in OCR_NID_GATE."""
+    decoded = decode_national_ids([id_number])
+    return all(bool(decoded[f"valid_{check}"][0]) for check in config.NID_GATE)
+
+
+def _nid_score(id_number):
+    decoded = decode_national_ids([id_number])
+    return sum(bool(decoded[f"valid_{check}"][0]) for check in config.NID_GATE)
+
+
+def enhance_nid_region(region):
+    """CLAHE contrast boost plus small-angle deskew of the nid strip."""
+    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+    gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4, 4)).apply(gray)
+
+    # Skew from the minimum-area rectangle around the (dark) digit pixels
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    points = cv2.findNonZero(ink)
+    if points is not None and len(points) > 20:
+        (cx, cy), (w, h), angle = cv2.minAreaRect(points)
+        if w < h:
+            angle -= 90
+        if 0.5 < abs(angle) < 15:
+            matrix = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+            gray = cv2.warpAffine(gray, matrix, (gray.shape[1], gray.shape[0]),
+                                  flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def _nid_retry_larger(region):
+    results = predict(DIGITS_MODEL, region, imgsz=config.NID_RETRY_IMGSZ, conf=config.NID_RETRY_CONF)
+    return national_id_digits(results)
+
+
+def _nid_retry_enhanced(region):
+    results = predict(DIGITS_MODEL, enhance_nid_region(region),
+                      imgsz=config.NID_RETRY_IMGSZ, conf=config.NID_RETRY_CONF)
+    return national_id_digits(results)
+
+
+def _nid_retry_tesseract(region):
+    text = tesseract_engine.image_to_string(preprocess_image(region), tess_config_digits)
+    digits = re.sub(r"\D", "", text.translate(ARABIC_DIGITS))
+    return digits, []
+
+
+NID_RETRIES = (
+    ("larger", _nid_retry_larger),
+    ("enhanced", _nid_retry_enhanced),
+    ("tesseract", _nid_retry_tesseract),
+)
+
+
+def read_national_id_cascade(cropped_image, bbox, first=None):
+    """
+    Cheap pass first (or `first`, already computed by the batch path); only if
+    it fails OCR_NID_GATE, retry on the nid region alone until one passes or
+    OCR_NID_RETRY_BUDGET_MS is spent. Returns (id_number, confidences).
+    """
+    if first is None:
+        first = read_national_id(cropped_image, bbox)
+    if nid_passes_gate(first[0]):
+        count_nid_attempt("base", "valid")
+        return first
+    count_nid_attempt("base", "invalid")
+    if not config.NID_RETRY_ENABLED:
+        return first
+
+    region = cropped_image if bbox is None else nid_region(cropped_image, bbox)
+    deadline = time.perf_counter() + config.NID_RETRY_BUDGET_MS / 1000.0
+    best, best_score = first, _nid_score(first[0])
+
+    for name, retry in NID_RETRIES:
+        if time.perf_counter() >= deadline:
+            count_nid_attempt(name, "skipped")
+            continue
+        with stage(f"nid_retry_{name}"):
+            try:
+                attempt = retry(region)
+            except Exception as e:
+                print(f"[WARN] nid retry '{name}' failed: {e}")
+                count_nid_attempt(name, "error")
+                continue
+        if nid_passes_gate(attempt[0]):
+            count_nid_attempt(name, "valid")
+            return attempt
+        count_nid_attempt(name, "invalid")
+        score = _nid_score(attempt[0])
+        if score > best_score:
+            best, best_score = attempt, score
+
+    return best
+
+
+def detect_national_id(cropped_image, draw=True, bbox=None):
+    if bbox is not None:
+        return read_national_id(cropped_image, bbox)[0]
+    results = predict(DIGITS_MODEL, cropped_image)
+    return national_id_from_results(results, cropped_image, draw=draw)
+
+
+def national_id_digits(results):
+    """Digits sorted left to right -> (id_number, [confidence per digit])."""
+    detected = []
+    for result in results:
+        for box in result.boxes:
+            detected.append((int(box.cls), float(box.xyxy[0][0]), float(box.conf)))
+
+    detected.sort(key=lambda x: x[1])
+    id_number = ''.join(str(cls) for cls, _, _ in detected)
+    return id_number, [round(conf, 3) for _, _, conf in detected]
+
+
+def national_id_from_results(results, cropped_image, draw=True):
     detected_info = []
 
     for result in results:
@@ -71,6 +268,9 @@ def detect_national_id(cropped_image):
             x1, y1, x2, y2 = map(int, box.xyxy[0])
             detected_info.append((cls, x1))
 
+            if not draw:
+                continue
+
             # Draw rectangle for debugging
             cv2.rectangle(cropped_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
             cv2.putText(cropped_image, str(cls), (x1, y1 - 10),
@@ -85,87 +285,128 @@ def detect_national_id(cropped_image):
 # 7. Decode Egyptian National ID
 # ----------------------------------------------------------------------
 def decode_egyptian_id(id_number):
-    governorates = {
-        '01': 'Cairo', '02': 'Alexandria', '03': 'Port Said', '04': 'Suez',
-        '11': 'Damietta', '12': 'Dakahlia', '13': 'Ash Sharqia', '14': 'Kaliobeya',
-        '15': 'Kafr El-Sheikh', '16': 'Gharbia', '17': 'Monoufia', '18': 'El Beheira',
-        '19': 'Ismailia', '21': 'Giza', '22': 'Beni Suef', '23': 'Fayoum',
-        '24': 'El Menia', '25': 'Assiut', '26': 'Sohag', '27': 'Qena',
-        '28': 'Aswan', '29': 'Luxor', '31': 'Red Sea', '32': 'New Valley',
-        '33': 'Matrouh', '34': 'North Sinai', '35': 'South Sinai', '88': 'Foreign'
-    }
-
-    century_digit = int(id_number[0])
-    year = int(id_number[1:3])
-    month = int(id_number[3:5])
-    day = int(id_number[5:7])
-    governorate_code = id_number[7:9]
-    gender_code = int(id_number[12:13])
-
-    if century_digit == 2:
-        full_year = 1900 + year
-    elif century_digit == 3:
-        full_year = 2000 + year
-    else:
-        raise ValueError("Invalid century digit")
-
-    gender = "Male" if gender_code % 2 != 0 else "Female"
-    governorate = governorates.get(governorate_code, "Unknown")
-    birth_date = f"{full_year:04d}-{month:02d}-{day:02d}"
-
+    """Birth date, governorate and gender of one ID (see national_id.decode_national_ids)."""
+    decoded = decode_national_id(id_number)
     return {
-        'Birth Date': birth_date,
-        'Governorate': governorate,
-        'Gender': gender
+        'Birth Date': decoded["birth_date"],
+        'Governorate': decoded["governorate"],
+        'Gender': decoded["gender"]
     }
 
 # ----------------------------------------------------------------------
 # 8. Process the Cropped ID Image
 # ----------------------------------------------------------------------
+EXPECTED_FIELDS = {'firstName', 'lastName', 'address', 'nid', 'serial'}
 
-def process_image(cropped_image, image_name):
-    model = YOLO('detect_odjects.pt')
-    results = model(cropped_image)
-
-    first_name, second_name, merged_name, nid, address, serial = '', '', '', '', '', ''
-    labels_data = []
 
+def best_field_boxes(results):
+    """{class name: bbox}, keeping the highest-confidence box of each class (single and batch paths)."""
+    boxes, confidences = {}, {}
     for result in results:
         for box in result.boxes:
-            bbox = [int(coord) for coord in box.xyxy[0].tolist()]
-            class_id = int(box.cls[0].item())
-            class_name = result.names[class_id]
+            class_name = result.names[int(box.cls[0].item())]
             confidence = float(box.conf[0].item())
+            if confidence > confidences.get(class_name, -1.0):
+                boxes[class_name] = [int(coord) for coord in box.xyxy[0].tolist()]
+                confidences[class_name] = confidence
+    return boxes
+
+def save_artifacts(cropped_image, image_name, labels_data, persist=None, error=False):
+    """
+    Queue the cropped card, an annotated copy and the label JSON for the
+    background writer, if the persistence policy selects this request.
+    """
+    if not persistence.should_persist(persist, error):
+        return
+
+    # Draw on a copy only now that we know it will be saved
+    annotated = persistence.snapshot(cropped_image)
+    persistence.writer.submit_image(os.path.join(IMAGES_DIR, image_name), persistence.snapshot(cropped_image))
+
+    for label in labels_data:
+        box = label["bbox"]
+        x1, y1, x2, y2 = box["x1"], box["y1"], box["x2"], box["y2"]
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(annotated, label["class"], (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+    persistence.writer.submit_image(os.path.join(ANNOTATIONS_DIR, f"annotated_{image_name}"), annotated)
+    persistence.writer.submit_json(
+        os.path.join(LABELS_DIR, f"{os.path.splitext(image_name)[0]}.json"), labels_data
+    )
 
-            if class_name == 'firstName':
-                first_name = extract_text_tesseract(cropped_image, bbox, lang='ara')
 
-            elif class_name == 'lastName':
-                second_name = extract_text_tesseract(cropped_image, bbox, lang='ara')
+def save_failed_input(image, image_name, persist=None):
+    """Keep the original image when the card could not be detected (on_error / always)."""
+    if persistence.should_persist(persist, error=True):
+        persistence.writer.submit_image(
+            os.path.join(IMAGES_DIR, f"failed_{image_name}"), persistence.snapshot(image)
+        )
 
-            elif class_name == 'serial':
-                # --- Crop the serial region ---
-                x1, y1, x2, y2 = bbox
-                cropped_serial = cropped_image[y1:y2, x1:x2]
 
-                # Save to temp path
-                temp_path = os.path.join(LABELS_DIR, f"temp_serial_{image_name}")
-                cv2.imwrite(temp_path, cropped_serial)
+# Streaming event (events.py) and response key of each text field
+TEXT_FIELD_EVENTS = {
+    'firstName': ("first_name", "First Name"),
+    'lastName': ("second_name", "Second Name"),
+    'address': ("address", "Address"),
+}
 
-                # Use utils.read_factory_number to extract
-                serial, variant_used = read_factory_number(temp_path)
 
-                # Remove temp file after reading
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+def read_text_field(cropped_image, bbox, denoised=None):
+    text = extract_text_tesseract(cropped_image, bbox, lang='ara', denoised=denoised)
+    if config.SPELL_CORRECT_FIELDS:
+        with stage("spell_correction"):
+            text = correct_text(text)
+    return text
 
-                print(f"[INFO] Serial extracted: {serial} (variant {variant_used})")
 
-            elif class_name == 'address':
-                address = extract_text_tesseract(cropped_image, bbox, lang='ara')
+def national_id_event(nid, confidences):
+    data = {"National Id": nid, "National Id Confidence": confidences}
+    try:
+        decoded = decode_egyptian_id(nid)
+        data.update({"Birth Date": decoded['Birth Date'], "City": decoded['Governorate'],
+                     "Gender": decoded['Gender']})
+    except Exception as e:
+        data["Error"] = str(e)
+    return data
+
+
+def field_event(class_name, value):
+    if class_name == 'nid':
+        return "national_id", national_id_event(*value)
+    if class_name == 'serial':
+        return "factory_number", {"Factory Number": value[0]}
+    event, key = TEXT_FIELD_EVENTS[class_name]
+    return event, {key: value}
+
+
+def _ocr_field(class_name, stage_name, fn, *args, **kwargs):
+    events.check()  # a cancelled stream skips the fields not started yet
+    with stage(stage_name):
+        value = fn(*args, **kwargs)
+    events.emit(*field_event(class_name, value))
+    return value
+
+
+def process_image(cropped_image, image_name, results=None, nid_number=None, persist=None):
+    # persist: None = OCR_PERSIST_POLICY decides, True / False forces it
+    # Batch callers pass in field detections / digits they already ran
+    if results is None:
+        with stage("field_detection"):
+            results = predict(FIELDS_MODEL, cropped_image)
 
-            elif class_name == 'nid':
-                nid = detect_national_id(cropped_image)
+    first_name, second_name, merged_name, nid, address, serial = '', '', '', '', '', ''
+    nid_confidence = []
+    labels_data = []
+    field_boxes = best_field_boxes(results)  # class name -> bbox (highest confidence wins)
+
+    # ---- 1. Collect the field detections ----
+    for result in results:
+        for box in result.boxes:
+            bbox = [int(coord) for coord in box.xyxy[0].tolist()]
+            class_id = int(box.cls[0].item())
+            class_name = result.names[class_id]
+            confidence = float(box.conf[0].item())
 
             # Save bounding box data
             labels_data.append({
@@ -179,23 +420,54 @@ def process_image(cropped_image, image_name):
                 }
             })
 
-            # Draw bounding boxes for annotated image
-            x1, y1, x2, y2 = bbox
-            cv2.rectangle(cropped_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(cropped_image, class_name, (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-    # Save annotated image
-    annotated_path = os.path.join(ANNOTATIONS_DIR, f"annotated_{image_name}")
-    cv2.imwrite(annotated_path, cropped_image)
-
-    # Save labels JSON
-    json_path = os.path.join(LABELS_DIR, f"{os.path.splitext(image_name)[0]}.json")
-    with open(json_path, "w", encoding="utf-8") as json_file:
-        json.dump(labels_data, json_file, indent=4, ensure_ascii=False)
+    # ---- 2. Recognise the fields concurrently (OCR_FIELD_WORKERS at a time) ----
+    tasks = {}
+    text_fields = [name for name in ('firstName', 'lastName', 'address') if name in field_boxes]
+    if text_fields:
+        # Grayscale the card once and denoise only the text fields; each field thresholds its own view
+        with stage("card_preprocess"):
+            denoised = denoise_fields(cropped_image, [field_boxes[name] for name in text_fields])
+    # Each field emits its streaming event as soon as it is read (readiness order)
+    for class_name in text_fields:
+        tasks[class_name] = (_ocr_field, (class_name, f"tesseract_{class_name}", read_text_field,
+                                          cropped_image, field_boxes[class_name]),
+                             {"denoised": denoised})
+    if 'serial' in field_boxes:
+        # Crop the serial region (a view, no copy / temp file)
+        x1, y1, x2, y2 = field_boxes['serial']
+        tasks['serial'] = (_ocr_field, ('serial', "factory_number", read_factory_number,
+                                        cropped_image[y1:y2, x1:x2]), {"localized": True})
+    if 'nid' in field_boxes:
+        # nid_number: (id_number, confidences) from the batch path, retried here if invalid
+        tasks['nid'] = (_ocr_field, ('nid', "nid_detection", read_national_id_cascade,
+                                     cropped_image, field_boxes['nid']), {"first": nid_number})
+
+    texts = run_parallel(tasks)
+    first_name = texts.get('firstName', '')
+    second_name = texts.get('lastName', '')
+    address = texts.get('address', '')
+    if 'serial' in texts:
+        serial, variant_used = texts['serial']
+        print(f"[INFO] Serial extracted: {serial} (variant {variant_used})")
+    if 'nid' in field_boxes:
+        nid, nid_confidence = texts['nid']
+
+    found_classes = set(field_boxes)
+    missing_fields = EXPECTED_FIELDS - found_classes
+    for field in missing_fields:
+        count_detection_failure(field)
+    if len(nid) != 14 or not nid.isdigit():
+        count_regex_miss("nid")
 
     merged_name = f"{first_name} {second_name}"
-    decoded_info = decode_egyptian_id(nid)
+    try:
+        decoded_info = decode_egyptian_id(nid)
+    except Exception:
+        save_artifacts(cropped_image, image_name, labels_data, persist, error=True)
+        raise
+
+    error = bool(missing_fields) or not serial
+    save_artifacts(cropped_image, image_name, labels_data, persist, error=error)
 
     return (
         first_name,
@@ -206,7 +478,8 @@ def process_image(cropped_image, image_name):
         serial,
         decoded_info["Birth Date"],
         decoded_info["Governorate"],
-        decoded_info["Gender"]
+        decoded_info["Gender"],
+        nid_confidence
     )
 
 # ----------------------------------------------------------------------
@@ -233,8 +506,6 @@ def process_image(cropped_image, image_name):
 
 #     return process_image(cropped_image, image_name)
 
-reader = easyocr.Reader(['en'])
-
 def preprocess_variants(img):
     """Generate different preprocessed versions of the image."""
     variants = []
@@ -259,53 +530,240 @@ def preprocess_variants(img):
 
     return variants
 
-def read_factory_number(image_path: str):
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
+# Names / relative cost of the variants above, in the same order
+VARIANT_NAMES = ["original", "gray", "otsu", "inverted", "upscaled"]
+VARIANT_COST_PRIORS = [1.0, 1.0, 1.1, 1.1, 2.5]
 
-    img = cv2.imread(image_path)
-    preprocessed_images = preprocess_variants(img)
+factory_engine = VariantEngine(VARIANT_NAMES, preprocess_variants, VARIANT_COST_PRIORS)
 
-    for i, processed in enumerate(preprocessed_images, start=1):
-        results = reader.readtext(processed, detail=0)
 
-        for text in results:
-            text = text.strip().replace(" ", "").replace("\n", "")
-            text = text.replace("O", "0").replace("o", "0")  # Fix OCR mistakes
+def read_factory_number(image, localized=False):
+    """
+    Read the factory number from an image path or an already-decoded BGR array.
+    Set `localized` when the image is already the serial box (recognition only).
+    Returns (serial, variant number) or (None, None).
+    """
+    img = load_image(image)
+    return factory_engine.read(img, localized=localized)
 
-            match = re.search(r'[A-Z]{2}\d{7}', text)
-            if match:
-                return match.group(0), i
 
-    return None, None
 
+def load_image(image):
+    """Return a BGR ndarray for a file path or encoded bytes; arrays are passed through untouched."""
+    if isinstance(image, np.ndarray):
+        return image
 
+    with stage("image_load"):
+        if isinstance(image, (bytes, bytearray)):
+            return decode_image_bytes(bytes(image))
 
-def detect_and_process_id_card(image_path, application_number):
-    # ---- 1. Load and convert image to JPG ----
-    image = Image.open(image_path).convert("RGB")  # Force RGB (handles PNG, etc.)
-    image_name = f"{application_number}.jpg"       # Use application number for naming
-    jpg_path = os.path.join(IMAGES_DIR, image_name)
-    image.save(jpg_path, "JPEG")                   # Save as JPG
+        if not os.path.exists(image):
+            raise FileNotFoundError(f"Image not found: {image}")
 
-    # ---- 2. Run YOLO on the JPG image ----
-    id_card_model = YOLO('detect_id_card.pt')
-    id_card_results = id_card_model(jpg_path)
+        # Ignore EXIF rotation to match the previous PIL-based loader
+        img = cv2.imread(image, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if img is None:
+            # Formats OpenCV cannot decode (GIF, ...) go through PIL
+            img = cv2.cvtColor(np.asarray(Image.open(image).convert("RGB")), cv2.COLOR_RGB2BGR)
+        return img
 
-    image_cv = cv2.imread(jpg_path)
-    cropped_image = None
+
+def load_card_image(image):
+    """Reduced-resolution decode for card detection (see image_io.CardImage)."""
+    with stage("image_load"):
+        return CardImage(image)
+
+
+def card_box(id_card_results):
+    box_xyxy = None
 
     for result in id_card_results:
         for box in result.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cropped_image = image_cv[y1:y2, x1:x2]
+            box_xyxy = list(map(int, box.xyxy[0]))
 
-    if cropped_image is None:
+    if box_xyxy is None:
+        count_detection_failure("card")
         raise ValueError("⚠️ ID card not detected!")
 
-    # ---- 3. Save cropped image with application number ----
-    cropped_path = os.path.join(IMAGES_DIR, image_name)
-    cv2.imwrite(cropped_path, cropped_image)
+    return box_xyxy
 
-    # ---- 4. Process image ----
-    return process_image(cropped_image, image_name)
+
+def crop_id_card(image_cv, id_card_results):
+    x1, y1, x2, y2 = card_box(id_card_results)
+    return image_cv[y1:y2, x1:x2]
+
+
+def crop_card(card_image, id_card_results):
+    """Map the box found on the preview back and crop the card at full resolution."""
+    box = card_box(id_card_results)
+    with stage("card_crop"):
+        return card_image.crop(box)
+
+
+def detect_and_process_id_card(image_path, application_number, persist=None):
+    """
+    `image_path` may be a file path, encoded image bytes or a decoded BGR ndarray.
+    `persist`: None applies OCR_PERSIST_POLICY, True / False forces artifact writes.
+    """
+    image_name = f"{application_number}.jpg"       # Use application number for naming
+
+    # ---- 1. Reduced decode (full resolution is decoded only for the card crop) ----
+    card_image = load_card_image(image_path)
+
+    # ---- 2. Same image seen before? (content / perceptual hash of the preview) ----
+    cache = get_cache()
+    if cache is not None:
+        cache_key, phash = cache.keys_for(card_image.preview)
+        cached = cache.get(cache_key, phash)
+        if cached is not None:
+            return cached
+
+    # ---- 3. Run YOLO on the preview, crop the card at full resolution ----
+    with stage("card_detection"):
+        id_card_results = predict(ID_CARD_MODEL, card_image.preview)
+    try:
+        cropped_image = crop_card(card_image, id_card_results)
+    except ValueError:
+        save_failed_input(card_image.preview, image_name, persist)
+        raise
+    events.emit("card", {"width": cropped_image.shape[1], "height": cropped_image.shape[0]})
+
+    # ---- 4. Process image (artifacts are queued for the background writer) ----
+    result = process_image(cropped_image, image_name, persist=persist)
+    if cache is not None:
+        cache.put(cache_key, phash, result)
+    return result
+
+
+def build_id_response(firstName, secName, fullName, nationalId, address, serial, birth, city, gender,
+                      nidConfidence=None):
+    # --- Process Second Name (max 4 parts) ---
+    secName_parts = secName.split()
+    if len(secName_parts) > 4:
+        secName = " ".join(secName_parts[:4])
+
+    # --- Process Full Name (exactly 5 parts if possible) ---
+    fullName_parts = fullName.split()
+    if len(fullName_parts) > 5:
+        fullName = " ".join(fullName_parts[:5])
+
+    return {
+        "First Name": firstName,
+        "Second Name": secName,
+        "Full Name": fullName,
+        "National Id": nationalId,
+        "Address": address,
+        "Factory Number": serial,
+        "Birth Date": birth,
+        "City": city,
+        "Gender": gender,
+        # Per-digit confidence of the National Id, left to right
+        "National Id Confidence": nidConfidence or []
+    }
+
+# ----------------------------------------------------------------------
+# 10. Batch Processing (one YOLO forward pass per stage for many cards)
+# ----------------------------------------------------------------------
+def predict_batch(model_name, images, **kwargs):
+    """
+    Run `model_name` over `images` in chunks of config.BATCH_INFER_SIZE.
+    Returns one Results object per image; if a chunk fails, its images are
+    retried one by one and any that still fail get the Exception instead.
+    """
+    outputs = []
+    size = max(1, config.BATCH_INFER_SIZE)
+
+    for start in range(0, len(images), size):
+        chunk = images[start:start + size]
+        try:
+            outputs.extend(predict(model_name, chunk, **kwargs))
+        except Exception:
+            for image in chunk:
+                try:
+                    outputs.extend(predict(model_name, image, **kwargs))
+                except Exception as e:
+                    outputs.append(e)
+
+    return outputs
+
+
+def detect_and_process_id_cards_batch(items, persist=None):
+    """
+    items: list of (image_path or ndarray, application_number).
+    Returns a list of (result, error) pairs in the same order, where result is
+    the tuple returned by detect_and_process_id_card and error is a message.
+    """
+    results = [None] * len(items)
+    errors = [None] * len(items)
+
+    # ---- 1. Reduced decode of every image (cached results skip the pipeline) ----
+    cache = get_cache()
+    cache_keys = {}  # index -> (content hash, perceptual hash)
+    loaded = []  # (index, image_name, card_image)
+    for i, (image_path, application_number) in enumerate(items):
+        try:
+            card_image = load_card_image(image_path)
+            if cache is not None:
+                cache_keys[i] = cache.keys_for(card_image.preview)
+                cached = cache.get(*cache_keys[i])
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            loaded.append((i, f"{application_number}.jpg", card_image))
+        except Exception as e:
+            errors[i] = str(e)
+
+    # ---- 2. Card detection (batched on the previews, full-resolution crops) ----
+    crops = []  # (index, image_name, cropped_image)
+    with stage("card_detection_batch"):
+        card_results = predict_batch(ID_CARD_MODEL, [card_image.preview for _, _, card_image in loaded])
+    for (i, image_name, card_image), card_result in zip(loaded, card_results):
+        try:
+            if isinstance(card_result, Exception):
+                raise card_result
+            try:
+                cropped_image = crop_card(card_image, [card_result])
+            except ValueError:
+                save_failed_input(card_image.preview, image_name, persist)
+                raise
+            crops.append((i, image_name, cropped_image))
+        except Exception as e:
+            errors[i] = str(e)
+
+    # ---- 3. Field detection (batched) ----
+    with stage("field_detection_batch"):
+        field_results = predict_batch(FIELDS_MODEL, [crop for _, _, crop in crops])
+
+    # ---- 4. Digit detection (batched on the padded nid regions) ----
+    nid_regions = {}  # position in crops -> padded nid view
+    for k, field_result in enumerate(field_results):
+        if isinstance(field_result, Exception):
+            continue
+        # Same box process_image will use for this card
+        bbox = best_field_boxes([field_result]).get('nid')
+        if bbox is not None:
+            nid_regions[k] = nid_region(crops[k][2], bbox)
+    with stage("nid_detection_batch"):
+        digit_results = predict_batch(DIGITS_MODEL, list(nid_regions.values()), imgsz=config.NID_IMGSZ)
+    nid_numbers = {}
+    for k, digit_result in zip(nid_regions, digit_results):
+        if not isinstance(digit_result, Exception):
+            nid_numbers[k] = national_id_digits([digit_result])
+
+    # ---- 5. Per-card OCR + decoding ----
+    for k, (i, image_name, cropped_image) in enumerate(crops):
+        try:
+            if isinstance(field_results[k], Exception):
+                raise field_results[k]
+            results[i] = process_image(
+                cropped_image, image_name,
+                results=[field_results[k]],
+                nid_number=nid_numbers.get(k),
+                persist=persist
+            )
+            if cache is not None:
+                cache.put(*cache_keys[i], results[i])
+        except Exception as e:
+            errors[i] = str(e)
+
+    return list(zip(results, errors))
@@ -0,0 +1,182 @@
+import re
+import threading
+import time
+import numpy as np
+import cv2
+
+import config
+import events
+from model_registry import read_text, recognize_text
+from metrics import stage, count_factory_variant, count_regex_miss
+
+SERIAL_PATTERN = re.compile(r'[A-Z]{2}\d{7}')
+
+# ----------------------------------------------------------------------
+# 1. Text Clean-up
+# ----------------------------------------------------------------------
+def match_serial(text):
+    text = text.strip().replace(" ", "").replace("\n", "")
+    text = text.replace("O", "0").replace("o", "0")  # Fix OCR mistakes
+
+    match = SERIAL_PATTERN.search(text)
+    return match.group(0) if match else None
+
+
+# ----------------------------------------------------------------------
+# 2. Hit Statistics (learned variant order)
+# ----------------------------------------------------------------------
+class VariantStats:
+    """
+    Per-variant attempts / hits / time. Variants are ordered by expected
+    hits per second, so the cheapest variant that usually wins goes first.
+    """
+
+    def __init__(self, names, cost_priors):
+        self.names = list(names)
+        self._priors = list(cost_priors)
+        self._attempts = [0] * len(names)
+        self._hits = [0] * len(names)
+        self._seconds = [0.0] * len(names)
+        self._timed = [0] * len(names)  # attempts that reported seconds
+        self._lock = threading.Lock()
+
+    def record(self, index, hit, seconds=None):
+        with self._lock:
+            self._attempts[index] += 1
+            self._hits[index] += int(hit)
+            if seconds is not None:
+                self._seconds[index] += seconds
+                self._timed[index] += 1
+
+    def _cost(self, index):
+        # Batched rounds record hits without a per-variant time, so they must
+        # not dilute the average of the timed attempts
+        timed = self._timed[index]
+        return self._seconds[index] / timed if timed else None
+
+    def _score(self, index):
+        attempts = self._attempts[index]
+        hit_rate = (self._hits[index] + 1) / (attempts + 2)  # Laplace smoothing
+        cost = self._cost(index)
+        if cost is None:
+            cost = self._priors[index]
+        return hit_rate / max(cost, 1e-6)
+
+    def order(self):
+        with self._lock:
+            return sorted(range(len(self.names)), key=self._score, reverse=True)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    "attempts": self._attempts[i],
+                    "hits": self._hits[i],
+                    "avg_ms": round(self._cost(i) * 1000, 2) if self._timed[i] else None,
+                }
+                for i, name in enumerate(self.names)
+            }
+
+
+# ----------------------------------------------------------------------
+# 3. Variant Engine
+# ----------------------------------------------------------------------
+class VariantEngine:
+    """
+    Reads the factory number from a list of preprocessed variants.
+
+    localized=True  -> the image is already the serial box: skip text
+                       detection and run the EasyOCR recognizer on the
+                       variants in batched rounds (best variants first)
+    localized=False -> full detect + recognise per variant, in learned order
+    """
+
+    def __init__(self, names, build_variants, cost_priors, first_round=None):
+        self.build_variants = build_variants
+        self.stats = VariantStats(names, cost_priors)
+        self.first_round = first_round or config.FACTORY_FIRST_ROUND
+
+    def read(self, img, localized=False):
+        serial, variant = self._read(img, localized)
+        if serial:
+            count_factory_variant(variant)
+        else:
+            count_regex_miss("serial")
+        return serial, variant
+
+    def _read(self, img, localized):
+        with stage("factory_variants_build"):
+            variants = self.build_variants(img)
+        order = self.stats.order()
+
+        if localized:
+            rounds = [order[:self.first_round], order[self.first_round:]]
+            for indices in rounds:
+                if not indices:
+                    continue
+                events.check()
+                with stage("factory_recognize_round"):
+                    serial, index = self._recognize_round(variants, indices)
+                if serial:
+                    return serial, index + 1
+            if not config.FACTORY_DETECT_FALLBACK:
+                return None, None
+
+        for index in order:
+            events.check()  # the slowest stage: stop between variants once the client is gone
+            start = time.perf_counter()
+            serial = None
+            with stage(f"factory_variant_{self.stats.names[index]}"):
+                texts = read_text(variants[index], detail=0)
+            for text in texts:
+                serial = match_serial(text)
+                if serial:
+                    break
+            self.stats.record(index, bool(serial), time.perf_counter() - start)
+            if serial:
+                return serial, index + 1
+
+        return None, None
+
+    def _recognize_round(self, variants, indices):
+        """Stack the chosen variants into one canvas and recognise all boxes in one call."""
+        grays = [_to_gray(variants[i]) for i in indices]
+        width = max(g.shape[1] for g in grays)
+        height = sum(g.shape[0] for g in grays)
+        canvas = np.full((height, width), 255, dtype=np.uint8)
+
+        boxes, tops, y = [], {}, 0
+        for i, gray in zip(indices, grays):
+            h, w = gray.shape
+            canvas[y:y + h, :w] = gray
+            boxes.append([0, w, y, y + h])
+            tops[y] = i
+            y += h
+
+        results = recognize_text(
+            canvas, horizontal_list=boxes, free_list=[],
+            batch_size=len(boxes), detail=1
+        )
+
+        found = {}
+        for box, text, _conf in results:
+            index = tops.get(int(box[0][1]))
+            if index is None:
+                continue
+            serial = match_serial(text)
+            if serial and index not in found:
+                found[index] = serial
+
+        for i in indices:
+            self.stats.record(i, i in found)
+
+        for i in indices:  # first hit in learned order
+            if i in found:
+                return found[i], i
+        return None, None
+
+
+def _to_gray(image):
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
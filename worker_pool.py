@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+import config
+
+# ----------------------------------------------------------------------
+# 1. Errors
+# ----------------------------------------------------------------------
+class QueueFullError(Exception):
+    """Raised when the pool already holds `max_workers + max_queue` jobs."""
+
+    def __init__(self, retry_after):
+        super().__init__("OCR worker queue is full")
+        self.retry_after = retry_after
+
+
+# ----------------------------------------------------------------------
+# 2. Helpers (module level so they pickle for process pools)
+# ----------------------------------------------------------------------
+def _timed_call(fn, args, kwargs):
+    started = time.time()
+    return started, fn(*args, **kwargs)
+
+
+def _init_process_worker():
+    from model_registry import init_models
+    from utils import warmup_tesseract
+    init_models()
+    if config.PRELOAD_MODELS:
+        warmup_tesseract()
+
+
+def _worker_ready():
+    from model_registry import is_warmed_up
+    time.sleep(0.05)  # keep this worker busy so the next call starts another process
+    return is_warmed_up() or not config.PRELOAD_MODELS or not config.WARMUP_MODELS
+
+
+# ----------------------------------------------------------------------
+# 3. Intra-request Fan-out (per-field OCR)
+# ----------------------------------------------------------------------
+_field_executor = None
+_field_executor_lock = threading.Lock()
+
+
+def _get_field_executor():
+    global _field_executor
+    if _field_executor is None:
+        with _field_executor_lock:
+            if _field_executor is None:
+                _field_executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.POOL_WORKERS * (config.FIELD_WORKERS - 1)),
+                    thread_name_prefix="ocr-field"
+                )
+    return _field_executor
+
+
+def run_parallel(tasks, limit=None):
+    """
+    Run `tasks` ({key: (fn, args, kwargs)}) with at most `limit` running at
+    once (config.FIELD_WORKERS); the calling thread takes part, so limit=1
+    is plain sequential. Returns {key: result} and re-raises the first error.
+    Each helper runs in a copy of the caller's context, so stage traces
+    still land on the request.
+    """
+    limit = max(1, config.FIELD_WORKERS if limit is None else limit)
+    pending = deque(tasks.items())
+    results = {}
+    errors = []
+    lock = threading.Lock()
+
+    def drain():
+        while True:
+            with lock:
+                if not pending or errors:
+                    return
+                key, (fn, args, kwargs) = pending.popleft()
+            try:
+                results[key] = fn(*args, **kwargs)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+    helpers = [
+        _get_field_executor().submit(contextvars.copy_context().run, drain)
+        for _ in range(min(limit, len(tasks)) - 1)
+    ]
+    drain()
+    for helper in helpers:
+        if not helper.cancel():  # still queued behind other requests -> nothing left for it
+            helper.result()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+# ----------------------------------------------------------------------
+# 4. Bounded Worker Pool
+# ----------------------------------------------------------------------
+class WorkerPool:
+    """Runs blocking OCR work off the event loop with a bounded queue in front of it."""
+
+    def __init__(self, kind=None, max_workers=None, max_queue=None, retry_after=None):
+        self.kind = kind or config.POOL_KIND
+        self.max_workers = max_workers or config.POOL_WORKERS
+        self.max_queue = config.POOL_QUEUE_SIZE if max_queue is None else max_queue
+        self.retry_after = retry_after or config.POOL_RETRY_AFTER
+
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_process_worker
+            )
+        elif self.kind == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="ocr-worker"
+            )
+        else:
+            raise ValueError(f"Unknown pool kind: {self.kind}")
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=1000)
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise QueueFullError(self.retry_after)
+            self._in_flight += 1
+
+    def _release(self, ok):
+        with self._lock:
+            self._in_flight -= 1
+            if ok:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` in the pool, or raise QueueFullError immediately."""
+        self._admit()
+        return await self._run_admitted(fn, args, kwargs)
+
+    def start(self, fn, *args, **kwargs):
+        """Like run(), but admits now (QueueFullError here) and returns a running asyncio Task."""
+        self._admit()
+        return asyncio.ensure_future(self._run_admitted(fn, args, kwargs))
+
+    async def _run_admitted(self, fn, args, kwargs):
+        submitted = time.time()
+        ok = False
+        try:
+            loop = asyncio.get_running_loop()
+            started, result = await loop.run_in_executor(
+                self._executor, partial(_timed_call, fn, args, kwargs)
+            )
+            self._waits.append(max(0.0, started - submitted))
+            ok = True
+            return result
+        finally:
+            self._release(ok)
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+            waits = sorted(self._waits)
+
+        def pct(p):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2)
+
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "running": min(in_flight, self.max_workers),
+            "queue_depth": max(0, in_flight - self.max_workers),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "wait_ms": {
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "max": round(waits[-1] * 1000, 2) if waits else 0.0,
+            },
+        }
+
+    def prime(self):
+        """Start every process worker (models load in its initializer) and wait for them."""
+        if self.kind != "process":
+            return True
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.max_workers)]
+        return all(future.result() for future in futures)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)